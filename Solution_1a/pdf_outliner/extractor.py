@@ -1,120 +1,227 @@
 import os
 import json
 import re
+import threading
 import fitz
 import numpy as np
 from pathlib import Path
-from collections import Counter
-from transformers import AutoTokenizer, AutoModel
-import torch
+from collections import Counter, deque
+
+from . import profiling
+from .embedding_cache import EmbeddingCache, model_fingerprint
+from .micro_batcher import MAX_WAIT, MicroBatcher
+from .layout import (
+    FORM_FIELDS, IGNORE_PHRASES, HEADING_TEMPLATES, TEMPLATE_SET,
+    body_size, candidate_lines, heading_candidate, heading_decision, in_header_or_footer, is_heading_heuristic,
+    TEXT_ONLY_FLAGS, page_range_candidates, read_page
+)
+from .onnx_backend import OnnxEncoder, backend_id, export_onnx, validate_backend
+from .template_scorer import TemplateScorer
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "embedding_cache"
+ONNX_DIR = Path(__file__).resolve().parent.parent / "onnx_model"
+SHARD_PAGES = 64
+
+
+def find_model_path():
+    base_dir = Path(__file__).resolve().parent.parent
+    snapshot_root = base_dir / "local_model" / "models--prajjwal1--bert-tiny" / "snapshots"
+    snapshot_dirs = list(snapshot_root.iterdir())
+    if not snapshot_dirs:
+        raise FileNotFoundError(f"No snapshot found in {snapshot_root}")
+    return snapshot_dirs[0]  # Use the first (and usually only) snapshot
+
 
 class PDFOutlineExtractor:
-    def __init__(self):
-        base_dir = Path(__file__).resolve().parent.parent
-        snapshot_root = base_dir / "local_model" / "models--prajjwal1--bert-tiny" / "snapshots"
-        snapshot_dirs = list(snapshot_root.iterdir())
-        if not snapshot_dirs:
-            raise FileNotFoundError(f"No snapshot found in {snapshot_root}")
-        model_path = snapshot_dirs[0]  # Use the first (and usually only) snapshot
+    def __init__(self, batch_size=32, cache_dir=DEFAULT_CACHE_DIR, backend="torch", cascade=True, text_only=False,
+                 experimental=False):
+        model_path = find_model_path()
+
+        # experimental=True also accepts onnx-int8, which fails --check-backend
+        validate_backend(backend, experimental)
+        model_id = model_fingerprint(model_path)
+
+        # torch and transformers take seconds to import, so they load with the first extractor
+        import torch
+        from transformers import AutoConfig, AutoTokenizer, AutoModel
 
         self.torch = torch
         self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        self.model = AutoModel.from_pretrained(model_path)
-
-        self.heading_templates = [
-            "introduction", "summary", "conclusion", "references", "appendix", "timeline", "milestones",
-            "approach", "evaluation", "content", "audience", "objectives", "requirements", "structure",
-            "outcomes", "table of contents", "revision history", "acknowledgements", "trademarks",
-            "documents and web sites", "career paths", "learning objectives", "entry requirements",
-            "keeping it current", "pathway options", "business outcomes", "background", "results", "discussion",
-            "abstract", "methodology", "goals", "pathway", "options", "regular", "distinction", "hope", "see", "there"
-        ]
-        self.template_embs = self._embed_texts(self.heading_templates)
+        self.hidden_size = AutoConfig.from_pretrained(model_path).hidden_size
+        self.batch_size = batch_size
+        self.backend = backend
+        # With cascade, candidates the heuristics already accept never reach the model
+        self.cascade = cascade
+        self.inferences_run = 0
+        self.inferences_avoided = 0
+        # text_only leaves image blocks out of get_text("dict"); faster on image-heavy pages, but lines next
+        # to an image can be grouped differently, so outlines may move
+        self.text_flags = TEXT_ONLY_FLAGS if text_only else fitz.TEXTFLAGS_DICT
+        self.page_kinds = Counter()
+        # With share_inference, documents on several threads send their batches through one scheduler
+        self.batcher = None
+        self._counter_lock = threading.Lock()
+
+        # The ONNX backends export the model once next to local_model/ and never keep the torch copy resident
+        self.model = None
+        self.onnx_encoder = None
+        if backend == "torch":
+            self.model = AutoModel.from_pretrained(model_path)
+        else:
+            onnx_path = export_onnx(lambda: AutoModel.from_pretrained(model_path), self.tokenizer,
+                                    ONNX_DIR / model_id, quantize=backend == "onnx-int8")
+            self.onnx_encoder = OnnxEncoder(onnx_path, self.tokenizer, pooling="cls",
+                                            threads=torch.get_num_threads())
+            model_id = f"{model_id}-{backend_id(backend)}"
+
+        # Embeddings are reused across lines and PDFs; cache_dir=None disables the on-disk store
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = EmbeddingCache(cache_dir, model_id, self.hidden_size)
+
+        self.heading_templates = HEADING_TEMPLATES
+        self.template_set = TEMPLATE_SET
+        # Templates, form labels and ignored phrases are embedded once; their scores are memoised by exact text
+        known = list(dict.fromkeys(self.heading_templates + sorted(FORM_FIELDS) + sorted(IGNORE_PHRASES)))
+        known_embs = self._embed_texts(known)
+        self.template_embs = known_embs[:len(self.heading_templates)]
+        self.scorer = TemplateScorer(self.heading_templates, self.template_embs,
+                                     fold_case=getattr(self.tokenizer, "do_lower_case", False))
+        self.scorer.remember(known, known_embs)
 
     def _embed_texts(self, texts):
-        # Generate embeddings for a list of texts using the BERT model
-        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="pt")
-        with self.torch.no_grad():
-            outputs = self.model(**inputs)
-        return outputs.last_hidden_state[:, 0, :].cpu().numpy()
+        # Generate embeddings for a list of texts, going to the BERT model only for cache misses
+        return self._cached(texts, self._encode)
+
+    def _embed_batched(self, texts):
+        # Same as _embed_texts, but misses are encoded in length-bucketed batches, through the batcher if shared
+        return self._cached(texts, self.batcher if self.batcher is not None else self._encode_batched)
+
+    def share_inference(self, max_batch=None, max_wait=MAX_WAIT):
+        """
+        Route the batched heading classification of every thread using this extractor through one
+        MicroBatcher, so concurrent documents fill shared forward passes of the single model copy.
+        max_batch defaults to batch_size. Returns the batcher; stop_sharing() closes it.
+        """
+        self.batcher = MicroBatcher(self._encode_batched, max_batch or self.batch_size, max_wait)
+        return self.batcher
+
+    def stop_sharing(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+
+    def _cached(self, texts, encode):
+        with profiling.stage("embed"):
+            if self.cache is None:
+                return encode(texts)
+            misses = self.cache.misses
+            embs = self.cache.embed(texts, encode)
+            profiling.count("cache_hits", len(texts) - (self.cache.misses - misses))
+            return embs
+
+    def _encode(self, texts):
+        # Generate embeddings for a list of texts using the BERT model (one forward pass)
+        profiling.count("model_calls")
+        profiling.count("model_texts", len(texts))
+        with profiling.stage("model"):
+            if self.onnx_encoder is not None:
+                return self.onnx_encoder(texts)
+            inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="pt")
+            if profiling.enabled():
+                profiling.count("tokens", int(inputs["attention_mask"].sum()))
+            with self.torch.no_grad():
+                outputs = self.model(**inputs)
+            return outputs.last_hidden_state[:, 0, :].cpu().numpy()
+
+    def _encode_batched(self, texts):
+        # Embed texts in length-bucketed batches so each forward pass carries little padding
+        embs = np.zeros((len(texts), self.hidden_size), dtype=np.float32)
+        if not texts:
+            return embs
+        lengths = [len(ids) for ids in self.tokenizer(texts, truncation=True, max_length=512)["input_ids"]]
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            embs[idx] = self._encode([texts[i] for i in idx])
+        return embs
+
+    def _template_sims(self, texts, embed):
+        # Best template similarity per text; memoised texts skip the model, the rest go through embed
+        sims = np.zeros(len(texts), dtype=np.float32)
+        unknown = []
+        for i, text in enumerate(texts):
+            known = self.scorer.lookup(text)
+            if known is None:
+                unknown.append(i)
+            else:
+                sims[i] = known[0]
+        profiling.count("memo_hits", len(texts) - len(unknown))
+        if unknown:
+            sims[unknown] = self.scorer.score(embed([texts[i] for i in unknown]))[0]
+        return sims
 
     def is_heading_llm(self, text):
         # Check similarity of input text against predefined heading templates using LLM embeddings
         if not text or len(text) < 3:
             return False
-        inputs = self.tokenizer([text], padding=True, truncation=True, max_length=512, return_tensors="pt")
-        with self.torch.no_grad():
-            outputs = self.model(**inputs)
-        text_emb = outputs.last_hidden_state[:, 0, :].cpu().numpy()[0]
-        sims = np.dot(self.template_embs, text_emb) / (
-            np.linalg.norm(self.template_embs, axis=1) * np.linalg.norm(text_emb) + 1e-8
-        )
-        return np.max(sims) > 0.7
-
-    def extract_title(self, doc):
+        return self._template_sims([text], self._embed_texts)[0] > 0.7
+
+    def _parse_page(self, page, body_only=True):
+        # layout.read_page with page and line counters for traces. Pages without fonts skip get_text;
+        # only page 1 (title) needs its header and footer lines.
+        with profiling.stage("parse_page"):
+            kind, parsed = read_page(page, self.text_flags, body_only)
+        self._count_pages(kind)
+        profiling.count("lines", len(parsed.lines))
+        return parsed
+
+    def _count_pages(self, kind, n=1):
+        with self._counter_lock:
+            self.page_kinds[kind] += n
+        profiling.count("pages", n)
+        profiling.count(f"pages_{kind}", n)
+
+    def _candidates(self, page, pno, title_key, two_pass=True):
+        with profiling.stage("candidates"):
+            candidates = self._page_candidates(page, pno, title_key, two_pass)
+        profiling.count("candidates", len(candidates))
+        return candidates
+
+    def extract_title(self, doc, first_page=None):
         # Extract document title by finding the largest text size on the first page
-        first = doc[0]
-        blocks = first.get_text("dict")['blocks']
-        sizes = [span["size"] for b in blocks if "lines" in b for line in b["lines"] for span in line["spans"]]
-        if not sizes:
+        if first_page is None:
+            first_page = self._parse_page(doc[0], body_only=False)
+        if not first_page.sizes:
             return "Untitled Document"
-        max_size = max(sizes)
-        title_spans = []
-        for b in blocks:
-            if "lines" not in b:
-                continue
-            for line in b["lines"]:
-                for span in line["spans"]:
-                    if span["size"] == max_size:
-                        title_spans.append(span["text"].strip())
-        title = " ".join(title_spans).strip()
+        max_size = max(first_page.sizes)
+        title = " ".join(line.max_text for line in first_page.lines if line.max_size == max_size).strip()
         return title or "Untitled Document"
 
     def is_heading_heuristic(self, line, body_size):
         # Use font size and boldness to heuristically decide heading
-        text = " ".join([s["text"] for s in line["spans"]]).strip()
-        if len(text) < 2 or text.isdigit():
-            return False
-        for s in line["spans"]:
-            if s["size"] > body_size + 1.5:
-                return True
-            if s["flags"] & 2:
-                return True
-        return False
+        return is_heading_heuristic(line, body_size)
 
-    def is_heading_combined(self, line, body_size):
-        # Combine heuristic + LLM to decide heading confidence
-        text = " ".join([s["text"] for s in line["spans"]]).strip()
-        if len(text) < 4 or text.isdigit():
-            return False
+    def _heading_candidate(self, line, body_size):
+        # Cheap filters of is_heading_combined that run before any model inference (layout.heading_candidate)
+        return heading_candidate(line, body_size)
 
-        form_fields = {"name", "age", "date", "designation", "service", "relationship", "from", "the", "fare", "rail"}
-        ignore_phrases = {
-            "version", "remarks", "copyright notice", "baseline", "extension", "syllabus", "foundation level.",
-            "foundation level", "consultants.", "projects.", "criteria.", "reference", "address", "mission statement",
-            "goals", "topjump", "parkway"
-        }
+    def _heading_decision(self, line, llm_strong):
+        # Final rule of is_heading_combined once the LLM similarity is known (layout.heading_decision)
+        return heading_decision(line, llm_strong)
 
-        if text.lower().strip(':').strip() in form_fields or text.lower().strip(':').strip() in ignore_phrases:
-            return False
-        if text.isupper() and len(text.split()) < 3 and text.lower() not in self.heading_templates:
-            return False
-        if not self.is_heading_heuristic(line, body_size):
+    def is_heading_combined(self, line, body_size):
+        # Combine heuristic + LLM to decide heading confidence; line is a layout.LineRecord
+        if not self._heading_candidate(line, body_size):
             return False
+        if self._decided_without_model(line):
+            self._count_inferences(run=0, avoided=1)
+            return True
 
         # LLM similarity scoring
-        inputs = self.tokenizer([text], padding=True, truncation=True, max_length=512, return_tensors="pt")
-        with self.torch.no_grad():
-            outputs = self.model(**inputs)
-        text_emb = outputs.last_hidden_state[:, 0, :].cpu().numpy()[0]
-        sims = np.dot(self.template_embs, text_emb) / (
-            np.linalg.norm(self.template_embs, axis=1) * np.linalg.norm(text_emb) + 1e-8
-        )
-        llm_strong = np.max(sims) > 0.9
-
-        if len(text.split()) >= 4 or text.lower() in self.heading_templates or llm_strong or sum(c.isalpha() for c in text) >= 8:
-            return True
-        return False
+        self._count_inferences(run=1, avoided=0)
+        llm_strong = self._template_sims([line.text], self._embed_texts)[0] > 0.9
+        return self._heading_decision(line, llm_strong)
 
     def level_from_size(self, size, sorted_sizes):
         # Infer heading level based on relative font size
@@ -126,78 +233,203 @@ class PDFOutlineExtractor:
             return "H3"
         return "H3"
 
-    def extract_outline(self, pdf_path):
-        # Main function to extract outline from a PDF
-        doc = fitz.open(pdf_path)
-        headings = []
-        title = self.extract_title(doc)
-        heading_counter = {}
+    def _page_candidates(self, page, pno, title_key, two_pass=True):
+        # Heading candidates of one page as (LineRecord, heading dict) pairs.
+        # With two_pass only the cheap filters run here and _classify_pages makes the model decision.
+        if not page.sizes:
+            return []
+        if two_pass:
+            lines = candidate_lines(page, title_key)
+        else:
+            body = body_size(page)
+            lines = [line for line in page.lines if not in_header_or_footer(line, page)
+                     and line.text != title_key and self.is_heading_combined(line, body)]
+        return self._with_levels(pno, lines, sorted(page.sizes.keys(), reverse=True))
+
+    def _with_levels(self, pno, lines, sorted_sizes):
+        # (LineRecord, heading dict) pairs for the candidate lines of one page
+        return [(line, {"level": self.level_from_size(line.size, sorted_sizes), "text": line.text, "page": pno + 1})
+                for line in lines]
+
+    def _decided_without_model(self, line):
+        # llm_strong only enters heading_decision through an OR, so a line accepted without it is final
+        return self.cascade and self._heading_decision(line, llm_strong=False)
+
+    def _count_inferences(self, run, avoided):
+        with self._counter_lock:
+            self.inferences_run += run
+            self.inferences_avoided += avoided
+        profiling.count("inferences_run", run)
+        profiling.count("inferences_avoided", avoided)
+
+    def _classify_pages(self, pages):
+        # Score every distinct undecided candidate text against the templates in batched forward passes
+        texts = dict.fromkeys(line.text for _, cands in pages for line, _ in cands)
+        undecided = list(dict.fromkeys(line.text for _, cands in pages for line, _ in cands
+                                       if not self._decided_without_model(line)))
+        self._count_inferences(run=len(undecided), avoided=len(texts) - len(undecided))
+        strong = dict(zip(undecided, self._template_sims(undecided, self._embed_batched) > 0.9))
+        return [(pno, [(line, h) for line, h in cands if self._heading_decision(line, strong.get(line.text, False))])
+                for pno, cands in pages]
+
+    def _page_headings(self, pno, page_candidates):
+        # Capture "table of contents" etc. if in early pages; such a page contributes only that heading
+        if pno < 5:
+            special_heading_on_page = None
+            for line, heading_dict in page_candidates:
+                if line.lower.strip(":. ") in ["contents", "content", "table of contents"]:
+                    special_heading_on_page = heading_dict
+            if special_heading_on_page is not None:
+                return [special_heading_on_page]
+        return [h for _, h in page_candidates]
+
+    def extract_outline(self, pdf_path, two_pass=True):
+        # Main function to extract outline from a PDF.
+        # two_pass collects the candidates of the whole document first and embeds them in batches;
+        # otherwise every candidate line goes through is_heading_combined on its own.
+        with profiling.stage("open"):
+            doc = fitz.open(pdf_path)
         num_pages = len(doc)
+        # Page 1 is parsed once and shared by title detection and the page loop
+        first_page = self._parse_page(doc[0], body_only=False)
+        with profiling.stage("title"):
+            title = self.extract_title(doc, first_page)
+        title_key = title.strip()
+        pages = []
 
         for pno in range(num_pages):
-            page = doc[pno]
-            blocks = page.get_text("dict")["blocks"]
-            page_height = page.rect.height
-            header_cutoff = page_height * 0.15
-            footer_cutoff = page_height * 0.85
-
-            sizes = [s["size"] for b in blocks if "lines" in b for line in b["lines"] for s in line["spans"]]
-            if not sizes:
-                continue
-
-            counter = Counter(sizes)
-            body = counter.most_common(1)[0][0]
-            sorted_sizes = sorted(counter.keys(), reverse=True)
-            page_headings = []
-            special_heading_on_page = None
+            page = first_page if pno == 0 else self._parse_page(doc[pno])
+            pages.append((pno, self._candidates(page, pno, title_key, two_pass)))
 
-            for b in blocks:
-                if "lines" not in b:
-                    continue
-                for line in b["lines"]:
-                    span_y = line["spans"][0]["origin"][1]
-                    if span_y < header_cutoff or span_y > footer_cutoff:
-                        continue
+        doc.close()
 
-                    text = " ".join([s["text"] for s in line["spans"]]).strip()
-                    if text.strip() == title.strip():
-                        continue
+        if two_pass:
+            with profiling.stage("classify"):
+                pages = self._classify_pages(pages)
+        return self._collect_outline(title, pages, num_pages)
 
-                    if self.is_heading_combined(line, body):
-                        lvl = self.level_from_size(line["spans"][0]["size"], sorted_sizes)
-                        heading_dict = {"level": lvl, "text": text, "page": pno + 1}
+    def extract_outline_sharded(self, pdf_path, executor, shard_pages=SHARD_PAGES):
+        """
+        extract_outline for very long PDFs: pages after the first are parsed and filtered in
+        shards of shard_pages on executor (a process pool), each worker opening the PDF itself;
+        PDFs of at most shard_pages pages are read in this process.
+        Only the candidate LineRecords come back; classification, the table-of-contents rule and
+        the document-wide repeated-heading filter run here, so the result equals extract_outline.
+        """
+        with profiling.stage("open"):
+            doc = fitz.open(pdf_path)
+        with doc:
+            num_pages = len(doc)
+            first_page = self._parse_page(doc[0], body_only=False)
+            with profiling.stage("title"):
+                title = self.extract_title(doc, first_page)
+            title_key = title.strip()
+            futures = []
+            if num_pages > shard_pages:
+                futures = [executor.submit(page_range_candidates, str(pdf_path), start,
+                                           min(start + shard_pages, num_pages), title_key, self.text_flags)
+                           for start in range(1, num_pages, shard_pages)]
 
-                        # Capture "table of contents" etc. if in early pages
-                        if pno < 5:
-                            text_lower = text.lower().strip(":. ")
-                            if text_lower in ["contents", "content", "table of contents"]:
-                                special_heading_on_page = heading_dict
+            pages = [(0, self._candidates(first_page, 0, title_key))]
+            # A single shard is not worth the round trip, so short PDFs are read here
+            if not futures:
+                pages += [(pno, self._candidates(self._parse_page(doc[pno]), pno, title_key))
+                          for pno in range(1, num_pages)]
 
-                        page_headings.append(heading_dict)
+        with profiling.stage("shards"):
+            for future in futures:
+                for pno, kind, lines, sorted_sizes in future.result():
+                    self._count_pages(kind)
+                    pages.append((pno, self._with_levels(pno, lines, sorted_sizes)))
+        if futures:
+            profiling.count("candidates", sum(len(c) for _, c in pages[1:]))
+        with profiling.stage("classify"):
+            pages = self._classify_pages(pages)
+        return self._collect_outline(title, pages, num_pages)
 
-            # Add special heading or all regular headings
-            if special_heading_on_page is not None:
-                headings.append(special_heading_on_page)
-                key = special_heading_on_page["text"].lower().strip()
+    def _collect_outline(self, title, pages, num_pages):
+        # Add special heading or all regular headings
+        headings = []
+        heading_counter = {}
+        for pno, page_candidates in pages:
+            for h in self._page_headings(pno, page_candidates):
+                headings.append(h)
+                key = h["text"].lower().strip()
                 heading_counter[key] = heading_counter.get(key, 0) + 1
-            else:
-                for h in page_headings:
-                    headings.append(h)
-                    key = h["text"].lower().strip()
-                    heading_counter[key] = heading_counter.get(key, 0) + 1
-
-        doc.close()
 
         # Filter out overly frequent headings (e.g., headers)
         min_count = max(2, int(num_pages * 0.5) + 1)
         filtered_headings = [h for h in headings if heading_counter[h["text"].lower().strip()] < min_count]
+        profiling.count("headings", len(filtered_headings))
 
         return {"title": title, "outline": filtered_headings}
 
-    def process_pdf(self, pdf_path):
-        # Wrapper with error handling
+    def iter_outline(self, pdf_path, window=32):
+        """
+        Streaming variant of extract_outline: returns (title, headings) where headings is a
+        generator that yields heading dicts in page order while the PDF is being read.
+
+        Repeated headers are suppressed with a sliding window instead of a document-wide count:
+        a heading is held back for `window` pages and dropped if its text occurs at least
+        max(2, window // 2 + 1) times within that window (the key then stays suppressed for the
+        rest of the document). Pending state never covers more than `window` pages, and for
+        documents of at most `window` pages the result equals extract_outline.
+        """
+        doc = fitz.open(pdf_path)
+        try:
+            first_page = self._parse_page(doc[0], body_only=False)
+            title = self.extract_title(doc, first_page)
+        except Exception:
+            doc.close()
+            raise
+        num_pages = len(doc)
+        min_count = max(2, int(min(num_pages, window) * 0.5) + 1)
+
+        def headings():
+            pending = deque()
+            counts = Counter()
+            suppressed = set()
+            try:
+                for pno in range(num_pages):
+                    page = first_page if pno == 0 else self._parse_page(doc[pno])
+                    page_candidates = self._candidates(page, pno, title.strip())
+                    with profiling.stage("classify"):
+                        _, page_candidates = self._classify_pages([(pno, page_candidates)])[0]
+
+                    for h in self._page_headings(pno, page_candidates):
+                        key = h["text"].lower().strip()
+                        if key in suppressed:
+                            continue
+                        counts[key] += 1
+                        pending.append((pno, key, h))
+                        if counts[key] >= min_count:
+                            suppressed.add(key)
+
+                    # Headings that have spent a full window in pending are final
+                    while pending and pending[0][0] <= pno - window:
+                        _, key, h = pending.popleft()
+                        counts[key] -= 1
+                        if key not in suppressed:
+                            yield h
+            finally:
+                doc.close()
+
+            for _, key, h in pending:
+                if key not in suppressed:
+                    yield h
+
+        return title, headings()
+
+    def process_pdf(self, pdf_path, executor=None, shard_pages=SHARD_PAGES, raise_errors=False):
+        # Wrapper with error handling; with an executor, PDFs longer than one shard are split by page range.
+        # A failed PDF gives an empty outline, or with raise_errors its exception, for callers that must tell
+        # the two apart
         try:
+            if executor is not None:
+                return self.extract_outline_sharded(pdf_path, executor, shard_pages)
             return self.extract_outline(pdf_path)
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error processing {pdf_path}: {e}")
             return {"title": "", "outline": []}
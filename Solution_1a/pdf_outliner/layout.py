@@ -0,0 +1,152 @@
+from collections import Counter
+from typing import NamedTuple
+
+import fitz
+
+# Image blocks carry no lines and decoding them dominates get_text("dict") on image-heavy pages.
+# Leaving them out can regroup lines next to images, so it is opt-in where outputs must not move.
+TEXT_ONLY_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+FORM_FIELDS = {"name", "age", "date", "designation", "service", "relationship", "from", "the", "fare", "rail"}
+IGNORE_PHRASES = {
+    "version", "remarks", "copyright notice", "baseline", "extension", "syllabus", "foundation level.",
+    "foundation level", "consultants.", "projects.", "criteria.", "reference", "address", "mission statement",
+    "goals", "topjump", "parkway"
+}
+HEADING_TEMPLATES = [
+    "introduction", "summary", "conclusion", "references", "appendix", "timeline", "milestones",
+    "approach", "evaluation", "content", "audience", "objectives", "requirements", "structure",
+    "outcomes", "table of contents", "revision history", "acknowledgements", "trademarks",
+    "documents and web sites", "career paths", "learning objectives", "entry requirements",
+    "keeping it current", "pathway options", "business outcomes", "background", "results", "discussion",
+    "abstract", "methodology", "goals", "pathway", "options", "regular", "distinction", "hope", "see", "there"
+]
+TEMPLATE_SET = set(HEADING_TEMPLATES)
+
+
+class LineRecord(NamedTuple):
+    # One text line of a page, flattened from PyMuPDF's block/line/span dict
+    text: str        # span texts joined with spaces, stripped
+    lower: str       # text.lower()
+    size: float      # size of the first span, used for levelling
+    max_size: float  # largest span size on the line
+    bold: bool       # any span with flags & 2
+    y: float         # baseline (origin y) of the first span
+    max_text: str    # stripped texts of the spans at max_size, joined with spaces (title assembly)
+
+
+class PageLines(NamedTuple):
+    lines: list      # LineRecord per line, in reading order
+    sizes: Counter   # span count per font size over the whole page
+    height: float
+
+
+def parse_page(page, flags=fitz.TEXTFLAGS_DICT, body_only=False):
+    # Walk the page's get_text("dict") once and keep only what the extractor reads.
+    # With body_only, header/footer lines only add their span sizes (body size and levels still see the
+    # whole page) and get no LineRecord; only the title on page 1 needs them.
+    height = page.rect.height
+    sizes = Counter()
+    lines = []
+    for b in page.get_text("dict", flags=flags)["blocks"]:
+        if "lines" not in b:
+            continue
+        for line in b["lines"]:
+            spans = line["spans"]
+            if not spans:
+                continue
+            if body_only and outside_body(spans[0]["origin"][1], height):
+                for s in spans:
+                    sizes[s["size"]] += 1
+                continue
+            max_size = spans[0]["size"]
+            bold = False
+            for s in spans:
+                sizes[s["size"]] += 1
+                if s["size"] > max_size:
+                    max_size = s["size"]
+                if s["flags"] & 2:
+                    bold = True
+            text = " ".join([s["text"] for s in spans]).strip()
+            max_text = " ".join([s["text"].strip() for s in spans if s["size"] == max_size])
+            lines.append(LineRecord(text, text.lower(), spans[0]["size"], max_size, bold,
+                                    spans[0]["origin"][1], max_text))
+    return PageLines(lines, sizes, height)
+
+
+def triage_page(page):
+    # Classify a page from its resources, before any content is interpreted. A page without fonts
+    # (its own or its form XObjects') and without annotations cannot yield text: "empty" or, with
+    # images, "scanned". Everything else is "text" and goes through get_text.
+    if page.get_fonts() or page.first_annot or page.first_widget:
+        return "text"
+    return "scanned" if page.get_images() else "empty"
+
+
+def read_page(page, flags=fitz.TEXTFLAGS_DICT, body_only=False):
+    # (triage kind, PageLines); pages that cannot hold text skip get_text and come back empty
+    kind = triage_page(page)
+    if kind != "text":
+        return kind, PageLines([], Counter(), page.rect.height)
+    return kind, parse_page(page, flags, body_only)
+
+
+def body_size(page):
+    # Most common span size of a PageLines; None for a page without text
+    return page.sizes.most_common(1)[0][0] if page.sizes else None
+
+
+def outside_body(y, height):
+    # Baselines in the top or bottom 15% of the page belong to running headers and footers
+    return y < height * 0.15 or y > height * 0.85
+
+
+def in_header_or_footer(line, page):
+    return outside_body(line.y, page.height)
+
+
+def is_heading_heuristic(line, body_size):
+    # Use font size and boldness to heuristically decide heading
+    if len(line.text) < 2 or line.text.isdigit():
+        return False
+    return line.max_size > body_size + 1.5 or line.bold
+
+
+def heading_candidate(line, body_size):
+    # Cheap layout and text filters that run before any model inference
+    text = line.text
+    if len(text) < 4 or text.isdigit():
+        return False
+    key = line.lower.strip(':').strip()
+    if key in FORM_FIELDS or key in IGNORE_PHRASES:
+        return False
+    if text.isupper() and len(text.split()) < 3 and line.lower not in TEMPLATE_SET:
+        return False
+    return is_heading_heuristic(line, body_size)
+
+
+def heading_decision(line, llm_strong):
+    # Final rule for a candidate once the model's template similarity is known
+    if len(line.text.split()) >= 4 or line.lower in TEMPLATE_SET or llm_strong or sum(c.isalpha() for c in line.text) >= 8:
+        return True
+    return False
+
+
+def candidate_lines(page, title_key):
+    # Lines of a PageLines that pass every heading filter that runs before the model decision
+    if not page.sizes:
+        return []
+    body = body_size(page)
+    return [line for line in page.lines
+            if not in_header_or_footer(line, page) and line.text != title_key and heading_candidate(line, body)]
+
+
+def page_range_candidates(pdf_path, start, stop, title_key, flags=fitz.TEXTFLAGS_DICT):
+    # Worker side of page sharding: (pno, triage kind, candidate lines, font sizes largest first) for
+    # pages [start, stop). Opens the PDF itself and needs nothing but fitz, so the pool never loads the model.
+    with fitz.open(pdf_path) as doc:
+        pages = []
+        for pno in range(start, stop):
+            kind, page = read_page(doc[pno], flags, body_only=True)
+            pages.append((pno, kind, candidate_lines(page, title_key), sorted(page.sizes, reverse=True)))
+    return pages
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Per-input-directory record of processed PDFs, for incremental reruns.
+
+    Each entry holds a file's sha256 (re-hashed only when its size or mtime changed) and the
+    key of the artifact computed from it. Artifacts are a JSON result plus an optional numpy
+    array, named by content hash and settings key, so a result is reused only for the same
+    bytes, model version and extractor settings. Call save() once the run is done.
+    """
+
+    def __init__(self, input_dir, settings, root=None):
+        self.input_dir = Path(input_dir)
+        self.root = Path(root) if root is not None else self.input_dir / ".manifest"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / "manifest.json"
+        self.settings = settings
+        self.settings_key = hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self.files = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+        self._digests = {}
+        self.reused = 0
+        self.stored = 0
+        self.removed = 0
+
+    def _stat_digest(self, filename):
+        if filename not in self._digests:
+            st = (self.input_dir / filename).stat()
+            entry = self.files.get(filename)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                digest = entry["sha256"]
+            else:
+                digest = file_digest(self.input_dir / filename)
+            self._digests[filename] = (digest, st.st_size, st.st_mtime_ns)
+        return self._digests[filename]
+
+    def _artifact_key(self, filename):
+        return f"{self._stat_digest(filename)[0][:32]}-{self.settings_key}"
+
+    def get(self, filename):
+        # (result, array) computed from this exact file under the current settings, or None
+        key = self._artifact_key(filename)
+        result_path = self.root / f"{key}.json"
+        if not result_path.exists():
+            return None
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+        array_path = self.root / f"{key}.npy"
+        array = np.load(array_path) if array_path.exists() else None
+        self._record(filename, key)
+        self.reused += 1
+        return result, array
+
+    def put(self, filename, result, array=None):
+        key = self._artifact_key(filename)
+        if array is not None:
+            np.save(self.root / f"{key}.tmp.npy", np.asarray(array))
+            os.replace(self.root / f"{key}.tmp.npy", self.root / f"{key}.npy")
+        with open(self.root / f"{key}.tmp", "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(self.root / f"{key}.tmp", self.root / f"{key}.json")
+        self._record(filename, key)
+        self.stored += 1
+
+    def _record(self, filename, key):
+        digest, size, mtime_ns = self._stat_digest(filename)
+        self.files[filename] = {"sha256": digest, "size": size, "mtime_ns": mtime_ns, "artifact": key}
+
+    def collect_garbage(self, present):
+        # Forget files no longer in the input directory and delete artifacts nothing refers to
+        present = set(present)
+        for filename in [f for f in self.files if f not in present]:
+            del self.files[filename]
+            self.removed += 1
+        self._sweep()
+
+    def _sweep(self):
+        live = {entry["artifact"] for entry in self.files.values()}
+        for path in self.root.iterdir():
+            if not path.name.startswith("manifest.") and path.name.split(".", 1)[0] not in live:
+                path.unlink()
+
+    def save(self):
+        # Also drops artifacts replaced during this run (changed files, new settings)
+        self._sweep()
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "files": self.files}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        return {"reused": self.reused, "stored": self.stored, "removed": self.removed, "tracked": len(self.files)}
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+MAX_WAIT = 0.005  # seconds the first request of a batch waits for company
+
+
+class MicroBatcher:
+    """
+    Shares one encoder between documents processed on many threads.
+
+    Callers submit a list of texts and block on the result; a single scheduler thread collects
+    requests until they hold max_batch texts or the oldest has waited max_wait seconds, encodes
+    the distinct texts of all of them in one call and hands each caller back its own rows. The
+    encoder therefore only ever runs on the scheduler thread, and texts several documents ask
+    for at once are encoded once. stats() reports queue depth, batch fill and wait times.
+    """
+
+    def __init__(self, encode, max_batch=32, max_wait=MAX_WAIT):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.encoded = 0
+        self._fills = []
+        self._depths = []
+        self._waits = []
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        # Future of the (len(texts), dim) embeddings
+        future = Future()
+        self._queue.put((list(texts), future, time.perf_counter()))
+        return future
+
+    def __call__(self, texts):
+        return self.submit(texts).result()
+
+    def close(self):
+        # Encode whatever is queued, then stop the scheduler thread
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        # Requests for the next batch, and whether close() was called
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        size = len(first[0])
+        deadline = first[2] + self.max_wait
+        while size < self.max_batch:
+            # Past the deadline, only requests that are already queued still join
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            size += len(item[0])
+        return batch, False
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch, closing = self._collect()
+            if batch:
+                self._flush(batch, depth=len(batch) + self._queue.qsize())
+
+    def _flush(self, batch, depth):
+        start = time.perf_counter()
+        unique = list(dict.fromkeys(text for texts, _, _ in batch for text in texts))
+        try:
+            embs = np.asarray(self.encode(unique))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        # Metrics first, so a caller that reads stats() after its result sees its own batch
+        passes = max(1, -(-len(unique) // self.max_batch))
+        with self._lock:
+            self.requests += len(batch)
+            self.texts += sum(len(texts) for texts, _, _ in batch)
+            self.batches += 1
+            self.encoded += len(unique)
+            self._fills.append(len(unique) / (passes * self.max_batch))
+            self._depths.append(depth)
+            self._waits.extend(start - submitted for _, _, submitted in batch)
+
+        row = {text: i for i, text in enumerate(unique)}
+        for texts, future, _ in batch:
+            future.set_result(embs[[row[text] for text in texts]])
+
+    def stats(self):
+        with self._lock:
+            waits = np.asarray(self._waits) * 1000
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "encoded": self.encoded,
+                "batches": self.batches,
+                "mean_fill": float(np.mean(self._fills)) if self._fills else 0.0,
+                "mean_queue_depth": float(np.mean(self._depths)) if self._depths else 0.0,
+                "max_queue_depth": max(self._depths, default=0),
+                "wait_ms_p50": float(np.percentile(waits, 50)) if len(waits) else 0.0,
+                "wait_ms_p95": float(np.percentile(waits, 95)) if len(waits) else 0.0,
+                "wait_ms_max": float(waits.max()) if len(waits) else 0.0,
+            }
@@ -0,0 +1,138 @@
+import inspect
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKENDS = ("torch", "onnx")
+# Dynamic int8 costs these small encoders too much accuracy to pass compare_encoders (min cosine
+# 0.655 for bert-tiny, 0.753 for MiniLM), so onnx-int8 is no CLI choice and needs experimental=True
+EXPERIMENTAL_BACKENDS = ("onnx-int8",)
+# Only MatMul weights are quantized, per output channel; embeddings, LayerNorm and the attention
+# score products stay float. Part of the int8 graph's file name and cache ids, so a new scheme re-exports.
+INT8_SCHEME = "matmul-pc"
+
+
+def validate_backend(backend, experimental=False):
+    allowed = BACKENDS + EXPERIMENTAL_BACKENDS if experimental else BACKENDS
+    if backend not in allowed:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {allowed}")
+
+
+def backend_id(backend):
+    # Backend name as used in embedding-cache and manifest keys; int8 carries its quantization scheme
+    return f"{backend}-{INT8_SCHEME}" if backend == "onnx-int8" else backend
+
+
+def export_onnx(load_torch_model, tokenizer, out_dir, quantize=False):
+    # Export a HF encoder to ONNX once (dynamic batch/sequence axes), optionally with dynamic int8 MatMuls.
+    # load_torch_model is only called when the graph is not on disk yet.
+    out_dir = Path(out_dir)
+    fp32_path = out_dir / "model.onnx"
+    int8_path = out_dir / f"model-int8-{INT8_SCHEME}.onnx"
+    target = int8_path if quantize else fp32_path
+    if target.exists():
+        return target
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if not fp32_path.exists():
+        import torch
+        model = load_torch_model()
+        model.eval()
+        sample = tokenizer(["onnx export sample"], return_tensors="pt")
+        input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        # Newer torch defaults to the dynamo exporter; the TorchScript one needs no extra packages
+        kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        tmp_path = out_dir / f"model.onnx.{os.getpid()}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(model, tuple(sample[k] for k in input_names), str(tmp_path),
+                              input_names=input_names, output_names=["last_hidden_state"],
+                              dynamic_axes=dynamic_axes, opset_version=14, **kwargs)
+        os.replace(tmp_path, fp32_path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp_path = out_dir / f"{int8_path.name}.{os.getpid()}.tmp"
+        quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8, per_channel=True,
+                         op_types_to_quantize=["MatMul"], extra_options={"MatMulConstBOnly": True})
+        os.replace(tmp_path, int8_path)
+    return target
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder served by an ONNX Runtime session.
+
+    Calling the encoder runs one forward pass over the given texts and pools the last hidden
+    state the same way the torch model is used: the CLS token, or a masked mean of all tokens.
+    """
+
+    def __init__(self, onnx_path, tokenizer, pooling="cls", normalize=False, max_length=512, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = tokenizer
+        self.pooling = pooling
+        self.normalize = normalize
+        self.max_length = max_length
+
+    def __call__(self, texts):
+        enc = self.tokenizer(list(texts), padding=True, truncation=True, max_length=self.max_length,
+                             return_tensors="np")
+        return self.forward(enc["input_ids"], enc["attention_mask"], enc.get("token_type_ids"))
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        # One pass over already tokenized and padded inputs
+        if token_type_ids is None:
+            token_type_ids = np.zeros_like(input_ids)
+        arrays = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+        feeds = {name: arrays[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+        if self.pooling == "cls":
+            emb = hidden[:, 0, :]
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            emb = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            emb = emb / np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+        return emb.astype(np.float32)
+
+    def encode(self, texts, batch_size=32):
+        # Length-sorted batches, like SentenceTransformer.encode
+        texts = list(texts)
+        out = None
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            emb = self([texts[i] for i in idx])
+            if out is None:
+                out = np.zeros((len(texts), emb.shape[1]), dtype=np.float32)
+            out[idx] = emb
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+def compare_encoders(reference, candidate, texts, tolerance=1e-4):
+    # Time both encode functions on texts and check the candidate's embeddings against the reference
+    start = time.perf_counter()
+    ref = np.asarray(reference(texts), dtype=np.float32)
+    ref_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cand = np.asarray(candidate(texts), dtype=np.float32)
+    cand_seconds = time.perf_counter() - start
+
+    cosine = np.sum(ref * cand, axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1) + 1e-8)
+    return {
+        "texts": len(texts),
+        "max_abs_diff": float(np.max(np.abs(ref - cand))) if len(texts) else 0.0,
+        "min_cosine": float(np.min(cosine)) if len(texts) else 1.0,
+        "within_tolerance": bool(len(texts) == 0 or np.min(cosine) >= 1 - tolerance),
+        "reference_seconds": ref_seconds,
+        "candidate_seconds": cand_seconds,
+        "speedup": ref_seconds / cand_seconds if cand_seconds else float("inf"),
+    }
@@ -0,0 +1,141 @@
+"""
+Stage timers and counters for per-document traces.
+
+Instrumented code calls stage(name) as a context manager and count(name, n). Both are no-ops
+until start() opens a trace, so the disabled cost is one global lookup per call. finish()
+closes the trace and returns it as a dict; TraceWriter writes traces as JSON lines, or as a
+Chrome trace (chrome://tracing, Perfetto) when the file name ends in .json.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import Counter
+
+_active = None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.trace.record(self.name, self.start, end)
+        return False
+
+
+class Trace:
+    def __init__(self, document):
+        self.document = document
+        self.start = time.perf_counter_ns()
+        self.stages = {}
+        self.counters = Counter()
+        self.events = []
+
+    def record(self, name, start, end):
+        total = self.stages.setdefault(name, [0, 0])
+        total[0] += end - start
+        total[1] += 1
+        self.events.append((name, start, end, threading.get_ident()))
+
+    def to_dict(self):
+        return {
+            "document": self.document,
+            "pid": os.getpid(),
+            "wall_s": (time.perf_counter_ns() - self.start) / 1e9,
+            "stages": {name: {"s": ns / 1e9, "calls": calls} for name, (ns, calls) in self.stages.items()},
+            "counters": dict(self.counters),
+            "events": [[name, start // 1000, (end - start) // 1000, tid] for name, start, end, tid in self.events],
+        }
+
+
+def enabled():
+    return _active is not None
+
+
+def start(document):
+    global _active
+    _active = Trace(document)
+    return _active
+
+
+def finish():
+    # Close the current trace and return it as a dict (None when no trace was open)
+    global _active
+    trace, _active = _active, None
+    return trace.to_dict() if trace is not None else None
+
+
+def stage(name):
+    trace = _active
+    return _NULL_STAGE if trace is None else _Stage(trace, name)
+
+
+def count(name, n=1):
+    trace = _active
+    if trace is not None:
+        trace.counters[name] += n
+
+
+class TraceWriter:
+    # Collects finished traces into one file: JSON lines, or a Chrome trace for *.json
+    def __init__(self, path):
+        self.path = path
+        self.chrome = str(path).endswith(".json")
+        self.events = []
+        self._file = None if self.chrome else open(path, "w", encoding="utf-8")
+
+    def write(self, trace):
+        if trace is None:
+            return
+        if not self.chrome:
+            summary = {k: v for k, v in trace.items() if k != "events"}
+            self._file.write(json.dumps(summary, ensure_ascii=False) + "\n")
+            self._file.flush()
+            return
+        for name, ts, dur, tid in trace["events"]:
+            self.events.append({"name": name, "ph": "X", "ts": ts, "dur": dur, "pid": trace["pid"], "tid": tid,
+                                "args": {"document": trace["document"]}})
+        self.events.append({"name": trace["document"], "ph": "i", "s": "p", "pid": trace["pid"], "tid": 0,
+                            "ts": trace["events"][-1][1] if trace["events"] else 0,
+                            "args": {"counters": trace["counters"]}})
+
+    def close(self):
+        if self.chrome:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        else:
+            self._file.close()
+
+
+def profile_call(out_path, fn, *args, top=20):
+    # Run fn(*args) under cProfile, dump the stats to out_path and print the top entries by cumulative time
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args)
+    profiler.dump_stats(out_path)
+    buf = io.StringIO()
+    pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(top)
+    print(buf.getvalue())
+    return result
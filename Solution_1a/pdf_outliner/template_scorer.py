@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def _normalise_rows(embs):
+    # L2-normalise each row; all-zero rows stay zero and score 0 against everything
+    norms = np.linalg.norm(embs, axis=1, keepdims=True)
+    return embs / np.where(norms > 0, norms, 1.0)
+
+
+class TemplateScorer:
+    """
+    Cosine similarity of text embeddings against a fixed bank of heading templates.
+
+    The template rows are normalised once at construction, so score() is a single matrix
+    multiply over a whole batch and returns each row's best similarity and the index of the
+    template it came from. remember() fills an exact-text memo of those results; lookup()
+    answers memoised texts without running the model. With fold_case (for uncased tokenizers,
+    where "Introduction" and "introduction" embed identically) the memo is keyed on text.lower().
+    """
+
+    def __init__(self, templates, template_embs, fold_case=False):
+        self.templates = list(templates)
+        self.matrix = _normalise_rows(np.asarray(template_embs, dtype=np.float32))
+        self.fold_case = fold_case
+        self.memo = {}
+
+    def _key(self, text):
+        return text.lower() if self.fold_case else text
+
+    def score(self, embs):
+        # (max similarity, argmax template index) per row of embs
+        sims = _normalise_rows(np.asarray(embs, dtype=np.float32)) @ self.matrix.T
+        best = np.argmax(sims, axis=1)
+        return sims[np.arange(len(best)), best], best
+
+    def remember(self, texts, embs):
+        best_sims, best = self.score(embs)
+        for text, sim, idx in zip(texts, best_sims, best):
+            self.memo[self._key(text)] = (float(sim), int(idx))
+
+    def lookup(self, text):
+        return self.memo.get(self._key(text))
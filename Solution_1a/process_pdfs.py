@@ -1,28 +1,330 @@
+import argparse
 import json
+import multiprocessing as mp
+import os
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from pdf_outliner.extractor import PDFOutlineExtractor
-from tests.test_solution import compare_outputs
+
+import fitz
+import numpy as np
+
+from pdf_outliner import profiling
+from pdf_outliner.embedding_cache import model_fingerprint
+from pdf_outliner.extractor import SHARD_PAGES, PDFOutlineExtractor, find_model_path
+from pdf_outliner.layout import parse_page
+from pdf_outliner.manifest import Manifest
+from pdf_outliner.micro_batcher import MAX_WAIT
+from pdf_outliner.onnx_backend import BACKENDS, backend_id, compare_encoders
+
+INPUT_DIR = Path("sample_dataset/pdfs")
+OUTPUT_DIR = Path("sample_dataset/outputs")
+
+# One extractor per worker process, built by the pool initializer
+_worker_extractor = None
+
+
+def _init_worker(threads_per_worker, batch_size, backend, text_only=False):
+    # Pin torch intra-op threads so N workers don't oversubscribe the machine, then load the model once
+    global _worker_extractor
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    _worker_extractor = PDFOutlineExtractor(batch_size=batch_size, backend=backend, text_only=text_only)
+
+
+def _process_in_worker(pdf_file, trace=False):
+    if trace:
+        profiling.start(pdf_file.name)
+    start = time.perf_counter()
+    result, ok = process_or_fail(_worker_extractor, pdf_file)
+    return pdf_file, result, ok, time.perf_counter() - start, profiling.finish()
+
+
+def process_or_fail(extractor, pdf_file, *args):
+    # (result, ok): a PDF that fails still gets an empty outline, but ok=False keeps it out of the manifest
+    try:
+        return extractor.process_pdf(pdf_file, *args, raise_errors=True), True
+    except Exception as e:
+        print(f"Error processing {pdf_file}: {e}")
+        return {"title": "", "outline": []}, False
+
+
+def write_result(pdf_file, result):
+    output_path = OUTPUT_DIR / f"{pdf_file.stem}.json"
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4, ensure_ascii=False)
+
+
+def write_result_streaming(pdf_file, extractor, window):
+    # Write headings to the JSON file as iter_outline yields them; same bytes as write_result.
+    # Returns (result, ok) like process_or_fail
+    output_path = OUTPUT_DIR / f"{pdf_file.stem}.json"
+    try:
+        title, headings = extractor.iter_outline(pdf_file, window=window)
+        count = 0
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(f'{{\n    "title": {json.dumps(title, ensure_ascii=False)},\n    "outline": [')
+            for h in headings:
+                f.write("," if count else "")
+                f.write("\n" + textwrap.indent(json.dumps(h, indent=4, ensure_ascii=False), " " * 8))
+                f.flush()
+                count += 1
+            f.write("\n    ]\n}" if count else "]\n}")
+        return {"title": title, "outline": [None] * count}, True
+    except Exception as e:
+        print(f"Error processing {pdf_file}: {e}")
+        result = {"title": "", "outline": []}
+        write_result(pdf_file, result)
+        return result, False
+
+
+def outline_settings(backend, stream_window, text_only=False):
+    # Everything besides the PDF bytes that changes the written outline
+    return {"model": model_fingerprint(find_model_path()), "backend": backend_id(backend), "stream_window": stream_window,
+            "text_only": text_only}
+
+
+def reuse_unchanged(pdf_files, manifest):
+    # Write the stored outline of every unchanged PDF and return the files that still need processing
+    manifest.collect_garbage(p.name for p in pdf_files)
+    remaining = []
+    for pdf_file in pdf_files:
+        cached = manifest.get(pdf_file.name)
+        if cached is None:
+            remaining.append(pdf_file)
+        else:
+            write_result(pdf_file, cached[0])
+    return remaining
+
+
+def remember(manifest, pdf_file, ok=True):
+    # Store what was written to the output file, so streamed and buffered runs are recorded alike.
+    # Failed PDFs are not stored: their empty outline is no result, and the next run retries them
+    if manifest is not None and ok:
+        with open(OUTPUT_DIR / f"{pdf_file.stem}.json", encoding="utf-8") as f:
+            manifest.put(pdf_file.name, json.load(f))
+
+
+def print_result(result):
+    print(f"   ├─ 🏷️  Title:   {result['title']}")
+    print(f"   └─ 📑 Headings: {len(result['outline'])}\n")
+
+
+def print_throughput(latencies, wall_time):
+    if not latencies:
+        return
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    print(f"⏱️  {len(latencies)} file(s) in {wall_time:.2f}s ({len(latencies) / wall_time:.2f} files/sec)")
+    print(f"   └─ Per-file latency: p50 {p50:.2f}s | p90 {p90:.2f}s | p99 {p99:.2f}s | max {max(latencies):.2f}s")
+
+
+def page_pool(page_workers):
+    # Page shards only run fitz. They are forked before the model and tokenizer start their thread
+    # pools: with fork, the first submit starts every worker
+    method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+    pool = ProcessPoolExecutor(max_workers=page_workers, mp_context=mp.get_context(method))
+    pool.submit(os.getpid).result()
+    return pool
+
+
+def run_serial(pdf_files, batch_size, backend, stream_window=None, manifest=None, tracer=None,
+               page_workers=1, shard_pages=SHARD_PAGES, text_only=False):
+    # With page_workers, PDFs longer than shard_pages are parsed in page-range shards on their own pool
+    pool = page_pool(page_workers) if page_workers > 1 else None
+    extractor = PDFOutlineExtractor(batch_size=batch_size, backend=backend, text_only=text_only)
+    latencies = []
+    try:
+        for i, pdf_file in enumerate(pdf_files, 1):
+            print(f"📄 [{i}/{len(pdf_files)}] Processing: {pdf_file.name}")
+            if tracer is not None:
+                profiling.start(pdf_file.name)
+            start = time.perf_counter()
+            if stream_window:
+                result, ok = write_result_streaming(pdf_file, extractor, stream_window)
+            else:
+                result, ok = process_or_fail(extractor, pdf_file, pool, shard_pages)
+                write_result(pdf_file, result)
+            remember(manifest, pdf_file, ok)
+            latencies.append(time.perf_counter() - start)
+            if tracer is not None:
+                tracer.write(profiling.finish())
+            print_result(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    kinds = extractor.page_kinds
+    if kinds["scanned"] or kinds["empty"]:
+        print(f"🗂️  Pages: {kinds['text']} with text, {kinds['scanned']} scanned and {kinds['empty']} empty "
+              f"skipped without text extraction")
+    total = extractor.inferences_run + extractor.inferences_avoided
+    if total:
+        print(f"🧮 Heading model: {extractor.inferences_run} inference(s) run, {extractor.inferences_avoided} "
+              f"avoided by the heuristics ({extractor.inferences_avoided / total:.0%})")
+    if extractor.cache is not None:
+        stats = extractor.cache.stats()
+        print(f"🗄️  Embedding cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+              f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    return latencies
+
+
+def run_threaded(pdf_files, threads, batch_size, backend, manifest=None, max_wait=MAX_WAIT, text_only=False):
+    # One model copy: documents are parsed on `threads` threads and their heading batches are
+    # merged by the extractor's micro-batcher into shared forward passes
+    extractor = PDFOutlineExtractor(batch_size=batch_size, backend=backend, text_only=text_only)
+    extractor.share_inference(max_wait=max_wait)
+
+    def process(pdf_file):
+        start = time.perf_counter()
+        return pdf_file, *process_or_fail(extractor, pdf_file), time.perf_counter() - start
+
+    latencies = []
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = [pool.submit(process, pdf_file) for pdf_file in pdf_files]
+            for i, future in enumerate(as_completed(futures), 1):
+                pdf_file, result, ok, elapsed = future.result()
+                latencies.append(elapsed)
+                write_result(pdf_file, result)
+                remember(manifest, pdf_file, ok)
+                print(f"📄 [{i}/{len(pdf_files)}] Done: {pdf_file.name} ({elapsed:.2f}s)")
+                print_result(result)
+        stats = extractor.batcher.stats()
+    finally:
+        extractor.stop_sharing()
+
+    if stats["batches"]:
+        print(f"🚦 Micro-batcher: {stats['requests']} request(s) in {stats['batches']} batch(es), "
+              f"{stats['encoded']} of {stats['texts']} texts encoded, mean fill {stats['mean_fill']:.0%}")
+        print(f"   └─ Queue depth: mean {stats['mean_queue_depth']:.1f} | max {stats['max_queue_depth']} "
+              f"| wait p50 {stats['wait_ms_p50']:.1f}ms | p95 {stats['wait_ms_p95']:.1f}ms "
+              f"| max {stats['wait_ms_max']:.1f}ms")
+    return latencies
+
+
+def run_parallel(pdf_files, workers, batch_size, backend, manifest=None, tracer=None, text_only=False):
+    # Hand out the largest files first so a big PDF picked up late doesn't become the straggler
+    pdf_files = sorted(pdf_files, key=lambda p: p.stat().st_size, reverse=True)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+
+    latencies = []
+    # spawn rather than fork: each worker imports torch and sets up its thread pool from a clean interpreter
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=_init_worker, initargs=(threads_per_worker, batch_size, backend, text_only)) as pool:
+        futures = [pool.submit(_process_in_worker, pdf_file, tracer is not None) for pdf_file in pdf_files]
+        for i, future in enumerate(as_completed(futures), 1):
+            pdf_file, result, ok, elapsed, trace = future.result()
+            latencies.append(elapsed)
+            if tracer is not None:
+                tracer.write(trace)
+            write_result(pdf_file, result)
+            remember(manifest, pdf_file, ok)
+            print(f"📄 [{i}/{len(pdf_files)}] Done: {pdf_file.name} ({elapsed:.2f}s)")
+            print_result(result)
+    return latencies
+
+
+def check_backend(backend, pdf_files, batch_size):
+    # Compare the backend's embeddings and speed against eager torch on every line of the input PDFs
+    reference = PDFOutlineExtractor(batch_size=batch_size, cache_dir=None)
+    candidate = PDFOutlineExtractor(batch_size=batch_size, cache_dir=None, backend=backend)
+    texts = []
+    for pdf_file in pdf_files:
+        with fitz.open(pdf_file) as doc:
+            texts.extend(line.text for page in doc for line in parse_page(page).lines if line.text)
+    texts = list(dict.fromkeys(texts))
+
+    report = compare_encoders(reference._encode_batched, candidate._encode_batched, texts)
+    status = "✅" if report["within_tolerance"] else "❌"
+    print(f"{status} {backend} vs torch on {report['texts']} lines: "
+          f"min cosine {report['min_cosine']:.5f}, max abs diff {report['max_abs_diff']:.2e}")
+    print(f"   └─ torch {report['reference_seconds']:.2f}s | {backend} {report['candidate_seconds']:.2f}s "
+          f"| speedup {report['speedup']:.2f}x")
+    return report["within_tolerance"]
+
 
 def main():
-    INPUT_DIR = Path("sample_dataset/pdfs")
-    OUTPUT_DIR = Path("sample_dataset/outputs")
+    parser = argparse.ArgumentParser(description="Extract title and outline JSON from PDFs")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes, each with its own model copy (default: 1)")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="documents processed concurrently by threads sharing one model through a micro-batcher")
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT * 1000, metavar="MS",
+                        help=f"with --threads, how long a batch waits to fill up (default: {MAX_WAIT * 1000:g}ms)")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="candidate lines per BERT forward pass (default: 32)")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="inference backend for the heading model (default: torch)")
+    parser.add_argument("--check-backend", action="store_true",
+                        help="compare --backend against torch on the input PDFs and exit")
+    parser.add_argument("--stream", type=int, nargs="?", const=32, default=None, metavar="WINDOW",
+                        help="write headings page by page with a WINDOW-page repeated-header filter (default: 32)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse outlines of PDFs unchanged since the last --incremental run")
+    parser.add_argument("--manifest-dir", type=Path, default=None,
+                        help="where --incremental keeps its manifest (default: <input dir>/.manifest)")
+    parser.add_argument("--trace", type=Path, default=None, metavar="FILE",
+                        help="write per-PDF stage timings and counters: JSON lines, or a Chrome trace for *.json")
+    parser.add_argument("--page-workers", type=int, default=1, metavar="N",
+                        help="split PDFs longer than --shard-pages into page ranges parsed by N processes")
+    parser.add_argument("--shard-pages", type=int, default=SHARD_PAGES,
+                        help=f"pages per shard with --page-workers (default: {SHARD_PAGES})")
+    parser.add_argument("--text-only", action="store_true",
+                        help="leave images out of text extraction: faster on image-heavy pages, may regroup lines")
+    parser.add_argument("--profile", type=Path, default=None, metavar="PDF",
+                        help="run only this PDF under cProfile and dump the stats to <output dir>/<name>.prof")
+    args = parser.parse_args()
+    if args.stream and args.workers > 1:
+        parser.error("--stream runs in a single process; drop --workers")
+    if args.page_workers > 1 and (args.workers > 1 or args.stream):
+        parser.error("--page-workers splits one PDF at a time; drop --workers and --stream")
+    if args.threads > 1 and (args.workers > 1 or args.stream or args.page_workers > 1 or args.trace):
+        parser.error("--threads shares one model in one process; drop --workers, --stream, --page-workers and --trace")
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    extractor = PDFOutlineExtractor()
     pdf_files = list(INPUT_DIR.glob("*.pdf"))
 
-    print(f"\n📂 Found {len(pdf_files)} PDF file(s) to process\n{'-' * 50}")
-    for i, pdf_file in enumerate(pdf_files, 1):
-        print(f"📄 [{i}/{len(pdf_files)}] Processing: {pdf_file.name}")
-        result = extractor.process_pdf(pdf_file)
+    if args.check_backend:
+        return 0 if check_backend(args.backend, pdf_files, args.batch_size) else 1
 
-        output_path = OUTPUT_DIR / f"{pdf_file.stem}.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=4, ensure_ascii=False)
+    if args.profile is not None:
+        pdf_file = args.profile if args.profile.exists() else INPUT_DIR / args.profile
+        extractor = PDFOutlineExtractor(batch_size=args.batch_size, backend=args.backend, text_only=args.text_only)
+        profile_path = OUTPUT_DIR / f"{pdf_file.stem}.prof"
+        print_result(profiling.profile_call(profile_path, extractor.process_pdf, pdf_file))
+        print(f"🔬 cProfile stats written to {profile_path}")
+        return 0
+
+    print(f"\n📂 Found {len(pdf_files)} PDF file(s) to process\n{'-' * 50}")
+    start = time.perf_counter()
+    manifest = None
+    if args.incremental:
+        manifest = Manifest(INPUT_DIR, outline_settings(args.backend, args.stream, args.text_only), root=args.manifest_dir)
+        pdf_files = reuse_unchanged(pdf_files, manifest)
+        print(f"♻️  {manifest.reused} unchanged, {len(pdf_files)} new or changed, {manifest.removed} removed\n")
 
-        print(f"   ├─ 🏷️  Title:   {result['title']}")
-        print(f"   └─ 📑 Headings: {len(result['outline'])}\n")
+    tracer = profiling.TraceWriter(args.trace) if args.trace is not None else None
+    try:
+        if not pdf_files:
+            latencies = []
+        elif args.threads > 1:
+            latencies = run_threaded(pdf_files, args.threads, args.batch_size, args.backend, manifest,
+                                     args.max_wait / 1000, args.text_only)
+        elif args.workers > 1:
+            latencies = run_parallel(pdf_files, args.workers, args.batch_size, args.backend, manifest, tracer,
+                                     args.text_only)
+        else:
+            latencies = run_serial(pdf_files, args.batch_size, args.backend, args.stream, manifest, tracer,
+                                   args.page_workers, args.shard_pages, args.text_only)
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if tracer is not None:
+            tracer.close()
+            print(f"🔬 Trace written to {args.trace}")
+    print_throughput(latencies, time.perf_counter() - start)
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Check that the embedding cache survives an interrupted write: a partial row left at the end of
+vectors.f32 does not shift the rows appended after it, and a key line cut off before its newline
+is never read as a mapping.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+SOLUTION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOLUTION_DIR))
+
+from pdf_outliner.embedding_cache import EmbeddingCache
+
+
+def test_partial_row_is_dropped():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(tmp, "test-model", dim=4)
+        cache.put_many(["a"], [[1, 2, 3, 4]])
+        with open(cache.vectors_path, "ab") as f:
+            f.write(b"\x00" * 6)
+        cache.put_many(["b"], [[5, 6, 7, 8]])
+
+        reopened = EmbeddingCache(tmp, "test-model", dim=4)
+        assert np.array_equal(reopened.get("a"), [1, 2, 3, 4]), reopened.get("a")
+        assert np.array_equal(reopened.get("b"), [5, 6, 7, 8]), f"misaligned row: {reopened.get('b')}"
+        assert cache.vectors_path.stat().st_size == 2 * 4 * 4
+    print("  ✅ partial row cut off, later rows read back intact")
+
+
+def test_partial_key_line_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(tmp, "test-model", dim=2)
+        cache.put_many([str(i) for i in range(13)], [[i, -i] for i in range(13)])
+        # "<key> 1" left over from writing "<key> 12"
+        with open(cache.keys_path, "a", encoding="utf-8") as f:
+            f.write(f"{cache.key('c')} 1")
+
+        reopened = EmbeddingCache(tmp, "test-model", dim=2)
+        assert reopened.get("c") is None, "a cut-off key line was trusted"
+        reopened.put_many(["d"], [[7, 7]])
+
+        final = EmbeddingCache(tmp, "test-model", dim=2)
+        assert final.get("c") is None
+        assert np.array_equal(final.get("d"), [7, 7]), final.get("d")
+        assert np.array_equal(final.get("12"), [12, -12])
+        assert cache.keys_path.read_text(encoding="utf-8").count("\n") == 14
+    print("  ✅ cut-off key line ignored and dropped before the next append")
+
+
+def main():
+    print("🧪 Testing embedding cache recovery")
+    print("=" * 50)
+    try:
+        test_partial_row_is_dropped()
+        test_partial_key_line_is_ignored()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Interrupted writes leave the cache consistent.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
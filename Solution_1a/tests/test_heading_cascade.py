@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Check that the heading cascade (model only for lines the heuristics leave undecided) gives the
+same outlines as running the model on every candidate.
+"""
+
+import sys
+from pathlib import Path
+
+SOLUTION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOLUTION_DIR))
+
+from pdf_outliner.extractor import PDFOutlineExtractor
+
+PDF_DIR = SOLUTION_DIR / "sample_dataset" / "pdfs"
+
+
+def test_cascade_matches_full_model():
+    full = PDFOutlineExtractor(cache_dir=None, cascade=False)
+    cascade = PDFOutlineExtractor(cache_dir=None)
+
+    pdf_files = sorted(PDF_DIR.glob("*.pdf"))
+    assert pdf_files, f"no sample PDFs in {PDF_DIR}"
+    for pdf_file in pdf_files:
+        for two_pass in (True, False):
+            expected = full.extract_outline(pdf_file, two_pass=two_pass)
+            actual = cascade.extract_outline(pdf_file, two_pass=two_pass)
+            assert actual == expected, f"{pdf_file.name} (two_pass={two_pass}) differs with the cascade"
+        print(f"  ✅ {pdf_file.name}: {len(expected['outline'])} headings, identical")
+
+    assert full.inferences_avoided == 0
+    assert cascade.inferences_avoided > 0
+    assert cascade.inferences_run + cascade.inferences_avoided == full.inferences_run
+    print(f"  ✅ {cascade.inferences_avoided} of {full.inferences_run} inferences avoided")
+
+
+def main():
+    print("🧪 Testing the heading cascade")
+    print("=" * 50)
+    try:
+        test_cascade_matches_full_model()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Cascade outlines match the full model.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Check that --incremental never remembers a failed PDF: its empty outline is written, but the
+manifest only stores the PDFs that were processed, so the next run retries the failed one.
+"""
+
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+SOLUTION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOLUTION_DIR))
+
+import process_pdfs
+from pdf_outliner.manifest import Manifest
+
+PDF_DIR = SOLUTION_DIR / "sample_dataset" / "pdfs"
+
+
+def run_twice(run):
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = Path(tmp) / "pdfs", Path(tmp) / "outputs"
+        input_dir.mkdir()
+        output_dir.mkdir()
+        shutil.copy(PDF_DIR / "file02.pdf", input_dir / "good.pdf")
+        (input_dir / "broken.pdf").write_bytes(b"%PDF-1.4 truncated")
+        settings = {"test": True}
+
+        saved_output_dir, process_pdfs.OUTPUT_DIR = process_pdfs.OUTPUT_DIR, output_dir
+        try:
+            manifest = Manifest(input_dir, settings)
+            pdf_files = process_pdfs.reuse_unchanged(sorted(input_dir.glob("*.pdf")), manifest)
+            run(pdf_files, manifest)
+            manifest.save()
+        finally:
+            process_pdfs.OUTPUT_DIR = saved_output_dir
+        assert (output_dir / "broken.json").exists(), "no output written for the failed PDF"
+
+        manifest = Manifest(input_dir, settings)
+        return [p.name for p in process_pdfs.reuse_unchanged(sorted(input_dir.glob("*.pdf")), manifest)]
+
+
+def test_failed_pdf_is_retried():
+    runs = {
+        "serial": lambda files, manifest: process_pdfs.run_serial(files, 32, "torch", manifest=manifest),
+        "streamed": lambda files, manifest: process_pdfs.run_serial(files, 32, "torch", stream_window=32,
+                                                                    manifest=manifest),
+        "threaded": lambda files, manifest: process_pdfs.run_threaded(files, 2, 32, "torch", manifest=manifest),
+    }
+    for name, run in runs.items():
+        remaining = run_twice(run)
+        assert remaining == ["broken.pdf"], f"{name}: next run would process {remaining}"
+        print(f"  ✅ {name}: failed PDF retried, processed PDF reused")
+
+
+def main():
+    print("🧪 Testing incremental runs with a failing PDF")
+    print("=" * 50)
+    try:
+        test_failed_pdf_is_retried()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Failed PDFs are never remembered.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
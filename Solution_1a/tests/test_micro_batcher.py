@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Check the cross-document micro-batcher: concurrent requests are merged into shared encoder calls
+and every caller gets back its own rows, and documents processed on threads through one shared
+extractor get the same outlines as a serial run.
+"""
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+SOLUTION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOLUTION_DIR))
+
+from pdf_outliner.extractor import PDFOutlineExtractor
+from pdf_outliner.micro_batcher import MicroBatcher
+
+PDF_DIR = SOLUTION_DIR / "sample_dataset" / "pdfs"
+
+
+def test_requests_are_merged():
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def encode(texts):
+        # The first call blocks until every other request is queued, so those must share one batch
+        calls.append(list(texts))
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+        return np.array([[len(t), t.count("a")] for t in texts], dtype=np.float32)
+
+    batcher = MicroBatcher(encode, max_batch=64, max_wait=0.001)
+    try:
+        requests = [["alpha"]] + [[f"text {i}", "shared", "a" * i] for i in range(1, 9)]
+        futures = [batcher.submit(requests[0])]
+        assert started.wait(5), "the encoder was never called"
+        futures += [batcher.submit(texts) for texts in requests[1:]]
+        release.set()
+        for texts, future in zip(requests, futures):
+            expected = np.array([[len(t), t.count("a")] for t in texts], dtype=np.float32)
+            assert np.array_equal(future.result(5), expected), f"wrong rows for {texts}"
+        stats = batcher.stats()
+    finally:
+        batcher.close()
+    assert len(calls) == 2, f"expected 2 encoder calls, got {len(calls)}"
+    assert calls[1].count("shared") == 1, "duplicate texts were encoded twice"
+    assert stats["requests"] == len(requests) and stats["batches"] == 2
+    print(f"  ✅ {stats['requests']} requests in {stats['batches']} encoder calls, "
+          f"{stats['encoded']} of {stats['texts']} texts encoded")
+
+
+def test_threaded_matches_serial():
+    pdf_files = sorted(PDF_DIR.glob("*.pdf"))
+    assert pdf_files, f"no sample PDFs in {PDF_DIR}"
+    expected = [PDFOutlineExtractor(cache_dir=None).process_pdf(p) for p in pdf_files]
+
+    extractor = PDFOutlineExtractor(cache_dir=None)
+    extractor.share_inference(max_wait=0.02)
+    try:
+        with ThreadPoolExecutor(max_workers=len(pdf_files)) as pool:
+            actual = list(pool.map(extractor.process_pdf, pdf_files))
+    finally:
+        extractor.stop_sharing()
+    for pdf_file, a, e in zip(pdf_files, actual, expected):
+        assert a == e, f"{pdf_file.name} differs when batched across threads"
+        print(f"  ✅ {pdf_file.name}: {len(e['outline'])} headings, identical")
+
+
+def main():
+    print("🧪 Testing the micro-batcher")
+    print("=" * 50)
+    try:
+        test_requests_are_merged()
+        test_threaded_matches_serial()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Batched requests and threaded outlines match.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Check that splitting a PDF into page-range shards (extract_outline_sharded) gives the same
+outlines as reading it page by page in one process.
+"""
+
+import multiprocessing as mp
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+SOLUTION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOLUTION_DIR))
+
+from pdf_outliner.extractor import PDFOutlineExtractor
+
+PDF_DIR = SOLUTION_DIR / "sample_dataset" / "pdfs"
+
+
+def test_sharded_matches_serial():
+    extractor = PDFOutlineExtractor(cache_dir=None)
+    pdf_files = sorted(PDF_DIR.glob("*.pdf"))
+    assert pdf_files, f"no sample PDFs in {PDF_DIR}"
+
+    # Two-page shards so that every multi-page sample is split across workers
+    with ProcessPoolExecutor(max_workers=2, mp_context=mp.get_context("spawn")) as pool:
+        for pdf_file in pdf_files:
+            expected = extractor.extract_outline(pdf_file)
+            actual = extractor.extract_outline_sharded(pdf_file, pool, shard_pages=2)
+            assert actual == expected, f"{pdf_file.name} differs when sharded"
+            print(f"  ✅ {pdf_file.name}: {len(expected['outline'])} headings, identical")
+
+
+def main():
+    print("🧪 Testing page sharding")
+    print("=" * 50)
+    try:
+        test_sharded_matches_serial()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Sharded outlines match the serial page loop.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
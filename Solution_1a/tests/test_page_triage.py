@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Check the page triage fast path: pages without fonts are classified as scanned or empty and skip
+get_text, and body-only parsing keeps exactly the lines and font sizes the outline is built from.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz
+
+SOLUTION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SOLUTION_DIR))
+
+from pdf_outliner.layout import in_header_or_footer, parse_page, read_page, triage_page
+
+PDF_DIR = SOLUTION_DIR / "sample_dataset" / "pdfs"
+
+
+def scanned_copy(pdf_file, out_path):
+    # Every page rendered to an image-only page, followed by a blank page and the first text page
+    with fitz.open(pdf_file) as src, fitz.open() as out:
+        for page in src:
+            scan = out.new_page(width=page.rect.width, height=page.rect.height)
+            scan.insert_image(scan.rect, pixmap=page.get_pixmap(dpi=72))
+        out.new_page()
+        out.insert_pdf(src, from_page=0, to_page=0)
+        out.save(out_path)
+        return len(src)
+
+
+def test_triage_kinds():
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = Path(tmp) / "scanned.pdf"
+        num_scans = scanned_copy(PDF_DIR / "file03.pdf", out_path)
+        with fitz.open(out_path) as doc:
+            kinds = [triage_page(page) for page in doc]
+            assert kinds == ["scanned"] * num_scans + ["empty", "text"], kinds
+            for page in doc:
+                kind, parsed = read_page(page)
+                if kind != "text":
+                    assert not parse_page(page).lines, f"page {page.number + 1} was skipped but has text"
+                    assert not parsed.lines and not parsed.sizes
+    print(f"  ✅ {num_scans} scanned, 1 empty and 1 text page classified")
+
+
+def test_body_only_matches_full_parse():
+    for pdf_file in sorted(PDF_DIR.glob("*.pdf")):
+        with fitz.open(pdf_file) as doc:
+            for page in doc:
+                full = parse_page(page)
+                kind, body = read_page(page, body_only=True)
+                assert kind == "text" or not full.lines, f"{pdf_file.name} p{page.number + 1} skipped with text"
+                expected = [line for line in full.lines if not in_header_or_footer(line, full)]
+                assert body.lines == expected, f"{pdf_file.name} p{page.number + 1}: body lines differ"
+                assert body.sizes == full.sizes, f"{pdf_file.name} p{page.number + 1}: font sizes differ"
+        print(f"  ✅ {pdf_file.name}: body lines and font sizes identical")
+
+
+def main():
+    print("🧪 Testing page triage")
+    print("=" * 50)
+    try:
+        test_triage_kinds()
+        test_body_only_matches_full_parse()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Triaged and body-only pages match full text extraction.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
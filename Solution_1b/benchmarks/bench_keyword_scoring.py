@@ -0,0 +1,73 @@
+"""
+Micro-benchmark for persona keyword scoring in rank_sections.
+
+Compares the per-keyword regex loop rank_sections used to run against utils.keyword_hits on
+synthetic sections, over a grid of keyword and section counts, and checks both give the same
+counts.
+
+    python benchmarks/bench_keyword_scoring.py [--keywords 10 100 1000] [--sections 100 1000]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from utils import keyword_hits
+
+
+def regex_loop_hits(texts, keywords):
+    # The original scoring: one regex scan per keyword per section
+    hits = []
+    for text in texts:
+        text = text.lower()
+        hits.append(sum(len(re.findall(rf"\b{k}\b", text)) for k in keywords))
+    return hits
+
+
+def make_corpus(n_keywords, n_sections, words_per_section, rng):
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 10)))
+             for _ in range(max(2000, 2 * n_keywords))]
+    keywords = rng.sample(vocab, n_keywords)
+    # A few multi-word and punctuated keywords exercise the regex fallback
+    keywords[:3] = ["annual report", "r&d", "drug discovery"][:min(3, n_keywords)]
+    sections = []
+    for _ in range(n_sections):
+        words = [rng.choice(vocab) for _ in range(words_per_section)]
+        words.insert(rng.randrange(len(words)), "Annual Report")
+        sections.append(" ".join(words).capitalize() + ".")
+    return keywords, sections
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--sections", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--words-per-section", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'keywords':>9} {'sections':>9} {'regex loop':>11} {'one pass':>10} {'speedup':>8}  same")
+    ok = True
+    for n_keywords in args.keywords:
+        for n_sections in args.sections:
+            keywords, sections = make_corpus(n_keywords, n_sections, args.words_per_section, random.Random(args.seed))
+            expected, loop_s = timed(regex_loop_hits, sections, keywords)
+            got, fast_s = timed(keyword_hits, sections, keywords)
+            same = expected == got
+            ok &= same
+            print(f"{n_keywords:>9} {n_sections:>9} {loop_s:>10.3f}s {fast_s:>9.3f}s {loop_s / fast_s:>7.1f}x  "
+                  f"{'✅' if same else '❌'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
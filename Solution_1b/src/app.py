@@ -1,13 +1,30 @@
+import argparse
 import json
+import multiprocessing as mp
 import os
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timezone
+import utils
 from utils import (
+    extract_text_from_pdf,
     extract_text_from_pdfs,
+    extract_documents,
+    pending_texts,
+    join_documents,
     embed_texts,
+    query_text,
+    rank_queries,
     rank_sections,
     refine_subsections,
     learn_new_keywords
 )
+from keyword_store import KeywordStore
+from manifest import Manifest
+from onnx_backend import BACKENDS
+import profiling
 
 # 📁 Collections to process
 COLLECTIONS = [
@@ -16,37 +33,44 @@ COLLECTIONS = [
     os.path.join(os.path.dirname(__file__), "../Collection_3/")
 ]
 
-# ✅ Load persona definitions
 PERSONA_FILE =  os.path.join(os.path.dirname(__file__), "persona.json")
-with open(PERSONA_FILE) as f:
-    PERSONAS = json.load(f)
+KEYWORD_DB = os.path.join(os.path.dirname(__file__), "persona_keywords.sqlite")
 
-# ✅ Loop through collections
-for COLLECTION_PATH in COLLECTIONS:
-    PDF_PATH = os.path.join(COLLECTION_PATH, "PDFs/")
-    INPUT_JSON = os.path.join(COLLECTION_PATH, "challenge1b_input.json")
 
-    collection_name = os.path.basename(os.path.normpath(COLLECTION_PATH))
-    OUTPUT_JSON = os.path.join(COLLECTION_PATH, f"solution1b_output.json")
+def load_personas():
+    # ✅ Open the keyword store, seeded from the persona definitions in persona.json
+    return KeywordStore(KEYWORD_DB, seed_file=PERSONA_FILE)
 
-    with open(INPUT_JSON) as f:
-        input_data = json.load(f)
 
-    persona = input_data["persona"]["role"].lower()
-    job = input_data["job_to_be_done"]["task"]
+def save_personas(personas):
+    # ✅ Learned keywords are committed as they are learned; just close the store
+    personas.close()
 
-    print(f"\n🚀 Processing: {collection_name}")
 
-    # 📄 Extract text
-    sections = extract_text_from_pdfs(PDF_PATH, input_data["documents"])
+def load_input(collection_path):
+    with open(os.path.join(collection_path, "challenge1b_input.json")) as f:
+        return json.load(f)
+
+
+def open_manifest(collection_path):
+    # Incremental runs keep one manifest per PDF folder; files no longer there are forgotten
+    pdf_folder = os.path.join(collection_path, "PDFs")
+    manifest = Manifest(pdf_folder, utils.section_settings())
+    manifest.collect_garbage(os.listdir(pdf_folder))
+    return manifest
+
 
-    # 🔍 Embed
-    task_embedding = embed_texts([persona + " " + job])[0]
-    section_texts = [s["text"] for s in sections]
-    section_embeddings = embed_texts(section_texts)
+def task_query(input_data):
+    return query_text(input_data["persona"]["role"], input_data["job_to_be_done"]["task"])
+
+
+def build_output(input_data, sections, section_embeddings, task_embedding, personas):
+    # Rank embedded sections for the collection's persona; returns (output, persona, ranked_sections)
+    persona = input_data["persona"]["role"].lower()
+    job = input_data["job_to_be_done"]["task"]
 
     # 🧩 Get persona keywords
-    persona_keywords = PERSONAS.get(persona, {}).get("keywords", [])
+    persona_keywords = personas.keywords(persona)
 
     # 🏅 Rank and refine
     ranked_sections = rank_sections(
@@ -56,9 +80,12 @@ for COLLECTION_PATH in COLLECTIONS:
         keywords=persona_keywords
     )
     subsections = refine_subsections(ranked_sections)
+    return format_output(input_data, persona, job, ranked_sections, subsections), persona, ranked_sections
+
 
+def format_output(input_data, persona, job, ranked_sections, subsections):
     # ✅ Build output
-    output = {
+    return {
         "metadata": {
             "input_documents": [doc["filename"] for doc in input_data["documents"]],
             "persona": persona,
@@ -77,17 +104,311 @@ for COLLECTION_PATH in COLLECTIONS:
         "subsection_analysis": subsections
     }
 
+
+def embed_sections(collection_path, documents, incremental=False):
+    # (sections, section_embeddings) of a collection's PDFs; unchanged PDFs come from the manifest
+    manifest = open_manifest(collection_path) if incremental else None
+    parts = extract_documents(os.path.join(collection_path, "PDFs/"), documents, manifest)
+    sections, section_embeddings = join_documents(documents, parts, embed_texts(pending_texts(parts)), manifest)
+    if manifest is not None:
+        manifest.save()
+    return sections, section_embeddings
+
+
+def rank_collection(collection_path, personas, incremental=False):
+    """
+    Rank the sections of one collection for its persona and job.
+    Returns (output, persona, ranked_sections); nothing is written to disk except, with
+    incremental=True, the manifest of sections and embeddings reused by the next run.
+    """
+    input_data = load_input(collection_path)
+
+    # 🔍 Embed the task, then the sections
+    task_embedding = embed_texts([task_query(input_data)])[0]
+    sections, section_embeddings = embed_sections(collection_path, input_data["documents"], incremental)
+
+    return build_output(input_data, sections, section_embeddings, task_embedding, personas)
+
+
+def rank_collection_queries(collection_path, queries, personas, incremental=False):
+    """
+    Rank one collection's sections for many (persona, job) queries instead of its own: the
+    sections are extracted and embedded once, all queries are embedded in one batch and scored
+    with a single matrix product (utils.rank_queries). Returns (output, persona, ranked_sections)
+    per query, in order.
+    """
+    input_data = load_input(collection_path)
+    sections, section_embeddings = embed_sections(collection_path, input_data["documents"], incremental)
+    results = rank_queries(queries, sections, section_embeddings, keywords_for=personas.keywords)
+    return [(format_output(input_data, persona.lower(), job, ranked_sections, subsections),
+             persona.lower(), ranked_sections)
+            for (persona, job), (ranked_sections, subsections) in zip(queries, results)]
+
+
+def load_queries(path):
+    # [{"persona": ..., "job": ...}, ...] -> [(persona, job), ...]
+    with open(path, encoding="utf-8") as f:
+        return [(q["persona"], q["job"]) for q in json.load(f)]
+
+
+def write_output(collection_path, output, name="solution1b_output.json"):
+    OUTPUT_JSON = os.path.join(collection_path, name)
     os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
     with open(OUTPUT_JSON, "w") as f:
         json.dump(output, f, indent=4)
+    return OUTPUT_JSON
+
+
+def process_collection(collection_path, personas, incremental=False, tracer=None):
+    # Rank one collection, write its solution1b_output.json and learn new keywords
+    collection_name = os.path.basename(os.path.normpath(collection_path))
+    print(f"\n🚀 Processing: {collection_name}")
+    if tracer is not None:
+        profiling.start(collection_name)
 
-    print(f"✅ Output written to {OUTPUT_JSON}")
+    output, persona, ranked_sections = rank_collection(collection_path, personas, incremental)
+    output_json = write_output(collection_path, output)
+    print(f"✅ Output written to {output_json}")
 
     # 🧠 Learn new keywords!
-    PERSONAS = learn_new_keywords(PERSONAS, persona, ranked_sections)
+    personas = learn_new_keywords(personas, persona, ranked_sections)
+    if tracer is not None:
+        tracer.write(profiling.finish())
+    return personas
+
+
+def run_pipelined(collections, personas, workers, incremental=False):
+    """
+    Process collections concurrently: every PDF of every collection is parsed in a process pool,
+    finished collections are embedded together by one shared encoder thread, and each collection
+    is ranked and written as soon as its embeddings are back.
+
+    Collections are isolated: one that fails is reported and the others still get their output.
+    Every collection is ranked with the persona keywords loaded at startup; the keywords learned
+    from all of them are merged afterwards in input order, so the result does not depend on which
+    collection finished first. With incremental=True, PDFs unchanged since the last incremental
+    run are neither parsed nor embedded. Returns (personas, failures).
+    """
+    inputs, manifests, failures, learned = {}, {}, {}, {}
+    for collection_path in collections:
+        try:
+            inputs[collection_path] = load_input(collection_path)
+            if incremental:
+                manifests[collection_path] = open_manifest(collection_path)
+        except Exception as e:
+            inputs.pop(collection_path, None)
+            failures[collection_path] = e
+    ready = queue.Queue()
+
+    def encode_and_rank():
+        # Drain every collection that is ready and send all their texts through the model at once
+        done = False
+        while not done:
+            batch = [ready.get()]
+            while True:
+                try:
+                    batch.append(ready.get_nowait())
+                except queue.Empty:
+                    break
+            done = None in batch
+            batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+
+            texts = []
+            for collection_path, parts in batch:
+                texts.append(task_query(inputs[collection_path]))
+                texts.extend(pending_texts(parts))
+            try:
+                embeddings = embed_texts(texts)
+            except Exception as e:
+                for collection_path, _ in batch:
+                    failures[collection_path] = e
+                continue
+
+            offset = 0
+            for collection_path, parts in batch:
+                task_embedding = embeddings[offset]
+                n_pending = len(pending_texts(parts))
+                new_embeddings = embeddings[offset + 1:offset + 1 + n_pending]
+                offset += 1 + n_pending
+                try:
+                    documents = inputs[collection_path]["documents"]
+                    sections, section_embeddings = join_documents(
+                        documents, parts, new_embeddings, manifests.get(collection_path)
+                    )
+                    output, persona, ranked_sections = build_output(
+                        inputs[collection_path], sections, section_embeddings, task_embedding, personas
+                    )
+                    output_json = write_output(collection_path, output)
+                    learned[collection_path] = (persona, ranked_sections)
+                    print(f"✅ Output written to {output_json}")
+                except Exception as e:
+                    failures[collection_path] = e
+
+    # Workers only extract text. They are forked before the encoder thread starts and before it loads
+    # the model (utils.get_model), so neither thread state nor torch is copied into them
+    context = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {}
+        parts = {}
+        for collection_path, input_data in inputs.items():
+            documents = input_data["documents"]
+            manifest = manifests.get(collection_path)
+            parts[collection_path] = [manifest.get(doc["filename"]) if manifest else None for doc in documents]
+            for i, doc in enumerate(documents):
+                if parts[collection_path][i] is not None:
+                    continue
+                pdf_path = os.path.join(collection_path, "PDFs/", doc["filename"])
+                future = pool.submit(extract_text_from_pdf, pdf_path, doc["filename"], utils.SECTIONISER)
+                futures[future] = (collection_path, i)
+            if all(part is not None for part in parts[collection_path]):
+                ready.put((collection_path, parts.pop(collection_path)))
+
+        encoder = threading.Thread(target=encode_and_rank, name="encoder")
+        encoder.start()
+        try:
+            for future in as_completed(futures):
+                collection_path, i = futures[future]
+                if collection_path in failures:
+                    continue
+                try:
+                    parts[collection_path][i] = (future.result(), None)
+                except Exception as e:
+                    failures[collection_path] = e
+                    continue
+                if all(part is not None for part in parts[collection_path]):
+                    print(f"📄 Extracted: {os.path.basename(os.path.normpath(collection_path))}")
+                    ready.put((collection_path, parts.pop(collection_path)))
+        finally:
+            ready.put(None)
+            encoder.join()
+            for manifest in manifests.values():
+                manifest.save()
+
+    # 🧠 Learn new keywords, in input order
+    for collection_path in collections:
+        if collection_path in learned:
+            personas = learn_new_keywords(personas, *learned[collection_path])
+    return personas, failures
+
+
+def check_backend(backend):
+    # ⚖️ Check the selected backend against eager torch on every section of the collections
+    texts = []
+    for collection_path in COLLECTIONS:
+        with open(os.path.join(collection_path, "challenge1b_input.json")) as f:
+            documents = json.load(f)["documents"]
+        texts.extend(s["text"] for s in extract_text_from_pdfs(os.path.join(collection_path, "PDFs/"), documents))
+    report = utils.check_backend(texts)
+    status = "✅" if report["within_tolerance"] else "❌"
+    print(f"{status} {backend} vs torch on {report['texts']} sections: "
+          f"min cosine {report['min_cosine']:.5f}, max abs diff {report['max_abs_diff']:.2e}")
+    print(f"   └─ torch {report['reference_seconds']:.2f}s | {backend} {report['candidate_seconds']:.2f}s "
+          f"| speedup {report['speedup']:.2f}x")
+    return report["within_tolerance"]
+
+
+def print_cache_stats():
+    stats = utils.get_cache().stats()
+    print(f"🗄️  Embedding cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+          f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+
+
+def print_encode_stats():
+    stats = utils.ENCODE_STATS
+    if not stats.texts:
+        return
+    print(f"🧮 Encoder: {stats.tokens} tokens in {stats.batches} batches, "
+          f"{stats.padding_efficiency():.0%} padding efficiency, {stats.tokens_per_second():.0f} tokens/sec")
+    if stats.split_texts:
+        print(f"   └─ {stats.split_texts} long section(s) embedded as {stats.windows - stats.texts + stats.split_texts} windows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank PDF sections for each collection's persona and job")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="inference backend for the embedding model (default: torch)")
+    parser.add_argument("--check-backend", action="store_true",
+                        help="compare --backend against torch on the collections' sections and exit")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="PDF extraction processes; above 1 runs all collections pipelined (default: 1)")
+    parser.add_argument("--sectioniser", choices=utils.SECTIONISERS, default="lines",
+                        help="split pages at capitalised lines, or at detected headings across pages (default: lines)")
+    parser.add_argument("--long-sections", choices=utils.LONG_SECTIONS_MODES, default="truncate",
+                        help="truncate sections at the model's max sequence length, or embed them as overlapping "
+                             "windows averaged into one vector (default: truncate)")
+    parser.add_argument("--token-budget", type=int, default=utils.TOKEN_BUDGET,
+                        help=f"max padded tokens per encoder batch (default: {utils.TOKEN_BUDGET})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse sections and embeddings of PDFs unchanged since the last --incremental run")
+    parser.add_argument("--trace", default=None, metavar="FILE",
+                        help="write per-collection stage timings and counters: JSON lines, or a Chrome trace for *.json")
+    parser.add_argument("--queries", default=None, metavar="FILE",
+                        help="rank every collection for each {\"persona\", \"job\"} in this JSON list; "
+                             "writes solution1b_batch_output.json")
+    parser.add_argument("--profile", default=None, metavar="COLLECTION",
+                        help="rank only this collection under cProfile and dump the stats to <collection>/rank_collection.prof")
+    args = parser.parse_args()
+    if args.trace and args.workers > 1:
+        parser.error("--trace follows one collection at a time; drop --workers")
+    if args.queries and args.workers > 1:
+        parser.error("--queries ranks one collection at a time; drop --workers")
+    utils.set_backend(args.backend)
+    utils.set_sectioniser(args.sectioniser)
+    utils.set_encoding(args.long_sections, args.token_budget)
+
+    if args.check_backend:
+        return 0 if check_backend(args.backend) else 1
+
+    personas = load_personas()
+
+    if args.profile is not None:
+        collection_path = args.profile if os.path.isdir(args.profile) else os.path.join(os.path.dirname(__file__), "..", args.profile)
+        profile_path = os.path.join(collection_path, "rank_collection.prof")
+        profiling.profile_call(profile_path, rank_collection, collection_path, personas)
+        save_personas(personas)
+        print(f"🔬 cProfile stats written to {profile_path}")
+        return 0
+
+    if args.queries:
+        failures = {}
+        queries = load_queries(args.queries)
+        for collection_path in COLLECTIONS:
+            results = rank_collection_queries(collection_path, queries, personas, args.incremental)
+            output_json = write_output(collection_path, [output for output, _, _ in results],
+                                       "solution1b_batch_output.json")
+            print(f"✅ {len(results)} rankings written to {output_json}")
+            # Every query was ranked with the keywords loaded at startup; learn afterwards, in query order,
+            # and only from the collection's own persona: another persona's keywords would pick up the
+            # vocabulary of documents it was never meant to read
+            own_persona = load_input(collection_path)["persona"]["role"].strip().lower()
+            for _, persona, ranked_sections in results:
+                if persona.strip() == own_persona:
+                    personas = learn_new_keywords(personas, persona, ranked_sections)
+    elif args.workers > 1:
+        personas, failures = run_pipelined(COLLECTIONS, personas, args.workers, args.incremental)
+    else:
+        # ✅ Loop through collections
+        failures = {}
+        tracer = profiling.TraceWriter(args.trace) if args.trace else None
+        for collection_path in COLLECTIONS:
+            personas = process_collection(collection_path, personas, args.incremental, tracer)
+        if tracer is not None:
+            tracer.close()
+            print(f"🔬 Trace written to {args.trace}")
+
+    stats = personas.stats()
+    save_personas(personas)
+    print(f"\n🎉 Updated persona keyword store: {stats['seed']} seed + {stats['learned']} learned "
+          f"keywords over {stats['personas']} personas")
+    print_cache_stats()
+    print_encode_stats()
+
+    for collection_path, error in failures.items():
+        print(f"❌ {os.path.basename(os.path.normpath(collection_path))} failed: {error}")
+    return 1 if failures else 0
 
-# ✅ Save back updated personas
-with open(PERSONA_FILE, "w") as f:
-    json.dump({"personas": PERSONAS}, f, indent=4)
 
-print("\n🎉 Updated persona.json with learned keywords!")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX platforms: appends are not locked across processes
+    fcntl = None
+
+
+def model_fingerprint(model_dir):
+    # Identify a local model by the content of its files; large weight files are sampled at both ends
+    digest = hashlib.sha256()
+    model_dir = Path(model_dir)
+    for path in sorted(p for p in model_dir.rglob("*") if p.is_file()):
+        size = path.stat().st_size
+        digest.update(f"{path.relative_to(model_dir).as_posix()}:{size}\n".encode("utf-8"))
+        with open(path, "rb") as f:
+            if size <= 2 << 20:
+                digest.update(f.read())
+            else:
+                digest.update(f.read(1 << 20))
+                f.seek(-(1 << 20), os.SEEK_END)
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def normalize_text(text):
+    # WordPiece tokenizers ignore runs of whitespace, so collapsing them does not change the embedding
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store for one model.
+
+    Vectors are appended to a float32 matrix on disk (read back through a memory map) and
+    indexed by sha1(model id + normalized text). Recently used vectors are also kept in an
+    in-memory LRU tier of at most max_memory_items entries. Lookups and stores are thread-safe;
+    the embed function itself runs outside the lock.
+    """
+
+    def __init__(self, cache_dir, model_id, dim, max_memory_items=10000):
+        self.model_id = model_id
+        self.dim = dim
+        self.max_memory_items = max_memory_items
+        self.root = Path(cache_dir) / model_id
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.root / "vectors.f32"
+        self.keys_path = self.root / "keys.log"
+
+        self.memory = OrderedDict()
+        self.rows = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._mmap = None
+        self._lock = threading.RLock()
+        self._load_index()
+
+    def _row_bytes(self):
+        return self.dim * 4
+
+    def _load_index(self):
+        # Only trust rows whose vector bytes made it to disk
+        n_rows = self.vectors_path.stat().st_size // self._row_bytes() if self.vectors_path.exists() else 0
+        if self.keys_path.exists():
+            with open(self.keys_path, encoding="utf-8") as f:
+                for line in f:
+                    # A line without its newline was cut off mid-write, e.g. "<key> 12" of "<key> 123"
+                    parts = line.split() if line.endswith("\n") else ()
+                    if len(parts) == 2 and int(parts[1]) < n_rows:
+                        self.rows[parts[0]] = int(parts[1])
+
+    def _repair_tail(self, vf, kf):
+        # An interrupted write can leave a partial row or key line at the end of the files; cut them
+        # off so appends start on a whole row and a new line. Called with the append lock held
+        size = os.fstat(vf.fileno()).st_size
+        if size % self._row_bytes():
+            os.ftruncate(vf.fileno(), size - size % self._row_bytes())
+        size = os.fstat(kf.fileno()).st_size
+        with open(self.keys_path, "rb") as f:
+            f.seek(max(0, size - 256))
+            tail = f.read(size - max(0, size - 256))
+        if tail and not tail.endswith(b"\n"):
+            os.ftruncate(kf.fileno(), size - len(tail) + tail.rfind(b"\n") + 1)
+
+    def _vectors(self, row):
+        # Remap the matrix when another writer (or this one) has appended past the current mapping
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            n_rows = self.vectors_path.stat().st_size // self._row_bytes()
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        return self._mmap
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vec):
+        self.memory[key] = vec
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def get(self, text):
+        with self._lock:
+            return self._get(text)
+
+    def _get(self, text):
+        key = self.key(text)
+        vec = self.memory.get(key)
+        if vec is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return vec
+        row = self.rows.get(key)
+        if row is not None:
+            vec = np.array(self._vectors(row)[row])
+            self._remember(key, vec)
+            self.disk_hits += 1
+            return vec
+        self.misses += 1
+        return None
+
+    def put_many(self, texts, vecs):
+        with self._lock:
+            self._put_many(texts, vecs)
+
+    def _put_many(self, texts, vecs):
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32).reshape(len(texts), self.dim)
+        keys = [self.key(t) for t in texts]
+        with open(self.vectors_path, "ab") as vf, open(self.keys_path, "a", encoding="utf-8") as kf:
+            if fcntl is not None:
+                fcntl.flock(vf, fcntl.LOCK_EX)
+            try:
+                self._repair_tail(vf, kf)
+                vf.seek(0, os.SEEK_END)
+                first_row = vf.tell() // self._row_bytes()
+                vf.write(vecs.tobytes())
+                vf.flush()
+                kf.write("".join(f"{k} {first_row + i}\n" for i, k in enumerate(keys)))
+                kf.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(vf, fcntl.LOCK_UN)
+        for i, k in enumerate(keys):
+            self.rows[k] = first_row + i
+            self._remember(k, vecs[i].copy())
+
+    def embed(self, texts, embed_fn):
+        # Return embeddings for texts, calling embed_fn only on the distinct texts not in the cache
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        missing = {}
+        for i, text in enumerate(texts):
+            vec = self.get(text)
+            if vec is None:
+                missing.setdefault(self.key(text), (text, []))[1].append(i)
+            else:
+                out[i] = vec
+        if missing:
+            miss_texts = [text for text, _ in missing.values()]
+            vecs = np.asarray(embed_fn(miss_texts), dtype=np.float32)
+            self.put_many(miss_texts, vecs)
+            for (_, idx), vec in zip(missing.values(), vecs):
+                out[idx] = vec
+        return out
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "stored": len(self.rows),
+        }
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import Counter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keywords (
+    persona   TEXT    NOT NULL,
+    keyword   TEXT    NOT NULL,
+    seed      INTEGER NOT NULL DEFAULT 0,  -- from persona.json: always kept, never evicted
+    count     INTEGER NOT NULL DEFAULT 0,  -- times seen in top-ranked sections
+    last_seen INTEGER NOT NULL DEFAULT 0,  -- the persona's generation at the last learn() that saw it
+    PRIMARY KEY (persona, keyword)
+);
+CREATE TABLE IF NOT EXISTS personas (
+    persona    TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL  -- learn() calls for this persona; only these age its keywords
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def load_seed_personas(path, field="keywords"):
+    """
+    Read persona.json ({"personas": {name: {"keywords": [...], "learned": [...]}}}) into
+    {name: [terms of `field`]}: "keywords" are the curated seeds, "learned" holds terms carried
+    over from older runs that are imported as ordinary, evictable learned keywords.
+    Files written by older versions nest "personas" several levels deep; every level is merged.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    seeds = {}
+    while isinstance(data, dict):
+        for name, entry in data.items():
+            if name != "personas" and isinstance(entry, dict):
+                seeds.setdefault(name.lower(), []).extend(entry.get(field, []))
+        data = data.get("personas")
+    return seeds
+
+
+class KeywordStore:
+    """
+    Persona keywords in a small SQLite file, deduplicated per persona (keywords are lowercased,
+    like the texts they are matched against).
+
+    Seed keywords come from persona.json and are re-imported whenever that file changes; its
+    "learned" lists are imported as learned keywords seen once, unless already known.
+    Learned keywords carry a frequency (how often they were seen) and a recency (the persona's
+    generation, i.e. its own learn() call, that last saw them); their weight is count * decay ** age.
+    Learning for one persona never ages another's keywords. After each learn() only the `capacity`
+    highest-weighted learned keywords of the persona are kept.
+    Every learn() is one transaction, so an interrupted run never leaves a half-written store.
+    """
+
+    def __init__(self, path, seed_file=None, capacity=200, decay=0.8):
+        self.path = path
+        self.capacity = capacity
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._db:
+            self._db.executescript(SCHEMA)
+        if seed_file is not None:
+            self._import_seeds(seed_file)
+
+    def _meta(self, key, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _generation(self, persona):
+        # Stores written before per-persona generations kept one global counter; its keywords' last_seen
+        # values are on that scale, so it is where every persona without its own row starts
+        row = self._db.execute("SELECT generation FROM personas WHERE persona = ?", (persona,)).fetchone()
+        return row[0] if row else int(self._meta("generation", 0))
+
+    def _import_seeds(self, seed_file):
+        with open(seed_file, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        with self._lock, self._db:
+            if self._meta("seed_digest") == digest:
+                return
+            # Seeds dropped from the file are forgotten unless they were also learned
+            self._db.execute("DELETE FROM keywords WHERE seed = 1 AND count = 0")
+            self._db.execute("UPDATE keywords SET seed = 0")
+            rows = {(persona, k.strip().lower()) for persona, keywords in load_seed_personas(seed_file).items()
+                    for k in keywords if k.strip()}
+            self._db.executemany(
+                "INSERT INTO keywords (persona, keyword, seed) VALUES (?, ?, 1) "
+                "ON CONFLICT (persona, keyword) DO UPDATE SET seed = 1", sorted(rows))
+            learned = {(persona, k.strip().lower()) for persona, keywords
+                       in load_seed_personas(seed_file, "learned").items() for k in keywords if k.strip()}
+            self._db.executemany(
+                "INSERT INTO keywords (persona, keyword, count, last_seen) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (persona, keyword) DO NOTHING",
+                sorted((persona, k, self._generation(persona)) for persona, k in learned))
+            self._set_meta("seed_digest", digest)
+            for (persona,) in self._db.execute("SELECT DISTINCT persona FROM keywords").fetchall():
+                self._evict(persona, self._generation(persona))
+
+    def has_persona(self, persona):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM keywords WHERE persona = ? LIMIT 1", (persona,)).fetchone() is not None
+
+    def keywords(self, persona):
+        # Seed keywords, then learned ones by decreasing weight
+        with self._lock:
+            generation = self._generation(persona)
+            rows = self._db.execute(
+                "SELECT keyword, seed, count, last_seen FROM keywords WHERE persona = ?", (persona,)).fetchall()
+        return [k for k, *_ in sorted(rows, key=lambda r: (-r[1], -self._weight(r[2], r[3], generation), r[0]))]
+
+    def _weight(self, count, last_seen, generation):
+        return count * self.decay ** (generation - last_seen)
+
+    def learn(self, persona, words):
+        # Count words (an iterable or Counter) for persona as one new generation, then evict
+        words = Counter(w.lower() for w in words) if not isinstance(words, Counter) else words
+        with self._lock, self._db:
+            generation = self._generation(persona) + 1
+            self._db.execute("INSERT OR REPLACE INTO personas (persona, generation) VALUES (?, ?)",
+                             (persona, generation))
+            self._db.executemany(
+                "INSERT INTO keywords (persona, keyword, count, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (persona, keyword) DO UPDATE SET count = count + excluded.count, "
+                "last_seen = excluded.last_seen",
+                [(persona, w, n, generation) for w, n in sorted(words.items())])
+            self._evict(persona, generation)
+
+    def _evict(self, persona, generation):
+        rows = self._db.execute(
+            "SELECT keyword, count, last_seen FROM keywords WHERE persona = ? AND seed = 0", (persona,)).fetchall()
+        if len(rows) <= self.capacity:
+            return
+        rows.sort(key=lambda r: (-self._weight(r[1], r[2], generation), r[0]))
+        self._db.executemany("DELETE FROM keywords WHERE persona = ? AND keyword = ?",
+                             [(persona, k) for k, _, _ in rows[self.capacity:]])
+
+    def stats(self):
+        with self._lock:
+            personas, seeds, learned = self._db.execute(
+                "SELECT COUNT(DISTINCT persona), SUM(seed), SUM(1 - seed) FROM keywords").fetchone()
+        return {"personas": personas, "seed": seeds or 0, "learned": learned or 0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
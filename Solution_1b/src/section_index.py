@@ -0,0 +1,187 @@
+"""
+Persistent section index for answering many persona/job queries against one document library.
+
+Sections (from extract_text_from_pdfs) are embedded once and stored with their metadata.
+Queries go through an IVF index (spherical k-means lists, probed nearest-first) to get a
+shortlist, and rank_sections' per-document quota and keyword bonus run on that shortlist
+only. The query command takes the persona's keywords from the keyword store, like app.py.
+Small libraries, or n_lists=0, use exact brute-force search.
+
+    python section_index.py build ../Collection_1 ../Collection_2 --out ../section_index
+    python section_index.py query ../section_index --persona "Travel Planner" --job "Plan a trip"
+    python section_index.py recall ../section_index --k 50 --n-probe 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BRUTE_FORCE_BELOW = 2000
+
+
+def _kmeans(vectors, n_lists, iterations=10, seed=0):
+    # Spherical k-means on L2-normalised rows; returns (centroids, assignment)
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    assignment = np.zeros(len(vectors), dtype=np.int64)
+    for _ in range(iterations):
+        for start in range(0, len(vectors), 65536):
+            assignment[start:start + 65536] = np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=n_lists)
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.maximum(norms, 1e-12)).astype(vectors.dtype)
+    return centroids, assignment
+
+
+class SectionIndex:
+    def __init__(self, embeddings, sections, centroids=None, list_offsets=None, list_members=None):
+        self.embeddings = embeddings          # (n, d) float32, L2-normalised
+        self.sections = sections              # metadata dicts, same order as embeddings
+        self.centroids = centroids            # (n_lists, d) or None for brute force
+        self.list_offsets = list_offsets      # list i holds list_members[offsets[i]:offsets[i + 1]]
+        self.list_members = list_members
+
+    @classmethod
+    def build(cls, sections, embeddings, n_lists=None, seed=0):
+        from utils import normalize_rows
+        embeddings = normalize_rows(np.asarray(embeddings, dtype=np.float32)).astype(np.float32)
+        if n_lists is None:
+            n_lists = int(np.sqrt(len(sections))) if len(sections) >= BRUTE_FORCE_BELOW else 0
+        if n_lists <= 0:
+            return cls(embeddings, list(sections))
+        centroids, assignment = _kmeans(embeddings, n_lists, seed=seed)
+        members = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        return cls(embeddings, list(sections), centroids, offsets, members)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "embeddings.npy"), self.embeddings)
+        if self.centroids is not None:
+            np.save(os.path.join(path, "centroids.npy"), self.centroids)
+            np.save(os.path.join(path, "list_offsets.npy"), self.list_offsets)
+            np.save(os.path.join(path, "list_members.npy"), self.list_members)
+        with open(os.path.join(path, "sections.json"), "w") as f:
+            json.dump(self.sections, f)
+
+    @classmethod
+    def load(cls, path):
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(path, "sections.json")) as f:
+            sections = json.load(f)
+        if not os.path.exists(os.path.join(path, "centroids.npy")):
+            return cls(embeddings, sections)
+        return cls(embeddings, sections,
+                   np.load(os.path.join(path, "centroids.npy")),
+                   np.load(os.path.join(path, "list_offsets.npy")),
+                   np.load(os.path.join(path, "list_members.npy")))
+
+    def search(self, query_embedding, k, n_probe=4):
+        # Indices of (approximately) the k most similar sections, best first
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        if self.centroids is None:
+            candidates = np.arange(len(self.sections))
+        else:
+            lists = np.argsort(-(self.centroids @ query))[:n_probe]
+            candidates = np.concatenate([self.list_members[self.list_offsets[i]:self.list_offsets[i + 1]]
+                                         for i in lists])
+        sims = np.asarray(self.embeddings[candidates]) @ query
+        if len(candidates) > k:
+            best = np.argpartition(-sims, k - 1)[:k]
+            candidates, sims = candidates[best], sims[best]
+        return candidates[np.argsort(-sims, kind="stable")]
+
+    def query(self, task_embedding, top_k=10, top_per_doc=3, keywords=None, shortlist=200, n_probe=4):
+        # rank_sections restricted to the ANN shortlist
+        from utils import rank_sections
+        candidates = np.sort(self.search(task_embedding, shortlist, n_probe))
+        return rank_sections([self.sections[i] for i in candidates], np.asarray(self.embeddings[candidates]),
+                             task_embedding, top_k=top_k, top_per_doc=top_per_doc, keywords=keywords)
+
+    def recall(self, queries, k=50, n_probe=4):
+        # Mean recall@k of search() against exact search, plus mean latency of both
+        exact_index = SectionIndex(self.embeddings, self.sections)
+        recalls, ann_s, exact_s = [], 0.0, 0.0
+        for q in queries:
+            start = time.perf_counter()
+            approx = self.search(q, k, n_probe)
+            ann_s += time.perf_counter() - start
+            start = time.perf_counter()
+            exact = exact_index.search(q, k)
+            exact_s += time.perf_counter() - start
+            recalls.append(len(set(approx.tolist()) & set(exact.tolist())) / max(1, len(exact)))
+        n = max(1, len(queries))
+        return {"recall": float(np.mean(recalls)) if recalls else 1.0,
+                "ann_ms": 1000 * ann_s / n, "exact_ms": 1000 * exact_s / n}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query a persistent section index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("collections", nargs="+", help="collection dirs with challenge1b_input.json and PDFs/")
+    build.add_argument("--out", required=True)
+    build.add_argument("--n-lists", type=int, default=None)
+    query = sub.add_parser("query")
+    query.add_argument("index")
+    query.add_argument("--persona", required=True)
+    query.add_argument("--job", required=True)
+    query.add_argument("--top-k", type=int, default=10)
+    query.add_argument("--n-probe", type=int, default=4)
+    recall = sub.add_parser("recall")
+    recall.add_argument("index")
+    recall.add_argument("--k", type=int, default=50)
+    recall.add_argument("--n-probe", type=int, default=4)
+    recall.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    from utils import embed_texts, extract_text_from_pdfs
+
+    if args.command == "build":
+        sections = []
+        for collection in args.collections:
+            with open(os.path.join(collection, "challenge1b_input.json")) as f:
+                documents = json.load(f)["documents"]
+            sections.extend(extract_text_from_pdfs(os.path.join(collection, "PDFs/"), documents))
+        index = SectionIndex.build(sections, embed_texts([s["text"] for s in sections]), n_lists=args.n_lists)
+        index.save(args.out)
+        lists = 0 if index.centroids is None else len(index.centroids)
+        print(f"✅ Indexed {len(sections)} sections into {args.out} ({lists or 'brute-force'} lists)")
+    elif args.command == "query":
+        from app import load_personas
+        from utils import query_text
+
+        index = SectionIndex.load(args.index)
+        # Same keyword bonus as app.py: the persona's seed and learned keywords from the keyword store
+        personas = load_personas()
+        try:
+            keywords = personas.keywords(args.persona.lower())
+        finally:
+            personas.close()
+        ranked = index.query(embed_texts([query_text(args.persona, args.job)])[0], top_k=args.top_k,
+                             keywords=keywords, n_probe=args.n_probe)
+        print(json.dumps([{"document": s["document"], "section_title": s["section_title"],
+                           "importance_rank": i + 1, "page_number": s["page_number"]}
+                          for i, s in enumerate(ranked)], indent=4))
+    else:
+        index = SectionIndex.load(args.index)
+        # Section titles make realistic short queries
+        rng = np.random.default_rng(0)
+        picks = rng.choice(len(index.sections), min(args.queries, len(index.sections)), replace=False)
+        queries = embed_texts([index.sections[i]["section_title"] for i in picks])
+        report = index.recall(queries, k=args.k, n_probe=args.n_probe)
+        print(f"🎯 recall@{args.k} {report['recall']:.3f} | ANN {report['ann_ms']:.2f} ms | "
+              f"exact {report['exact_ms']:.2f} ms per query")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Compact on-disk store of embedded sections for large libraries.
+
+Vectors are L2-normalised and quantized, either to float16 or to int8 with one float32 scale per
+vector, and kept in a contiguous .npy file that is memory-mapped on open. Section text and
+metadata go to sections.jsonl, with the byte offset of every line in offsets.npy, so a section
+is read only when it is ranked. Document ids per section are kept as a small int32 array for the
+per-document quota. utils.rank_sections accepts a SectionStore in place of (sections, embeddings)
+and scores its vectors chunk by chunk. With keywords, only the utils.STORE_SHORTLIST most similar
+sections are read and get the keyword bonus; decoding every section's text would make each
+keyword query a full scan of sections.jsonl.
+
+    python section_store.py build ../Collection_1 ../Collection_2 --out ../section_store --dtype int8
+    python section_store.py compare ../Collection_1 ../Collection_2 --dtype float16 int8
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+DTYPES = ("float16", "int8")
+CHUNK_ROWS = 65536
+
+
+class QuantizedVectors:
+    """
+    (n, d) L2-normalised vectors as float16, or as int8 rows with a float32 scale each
+    (row ~= data[i] * scales[i]). similarities() dequantizes CHUNK_ROWS rows at a time, so the
+    float32 working set stays bounded however many rows there are.
+    """
+
+    def __init__(self, data, scales=None):
+        self.data = data
+        self.scales = scales
+
+    @classmethod
+    def quantize(cls, embeddings, dtype="float16"):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown dtype {dtype!r}, expected one of {DTYPES}")
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if dtype == "float16":
+            return cls(vectors.astype(np.float16))
+        scales = np.max(np.abs(vectors), axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.clip(np.rint(vectors / scales[:, np.newaxis]), -127, 127).astype(np.int8)
+        return cls(data, scales.astype(np.float32))
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def similarities(self, query, chunk_rows=CHUNK_ROWS):
+        # Cosine similarity of every row to query, as float32
+        query = np.asarray(query, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        sims = np.empty(len(self.data), dtype=np.float32)
+        for start in range(0, len(self.data), chunk_rows):
+            chunk = np.asarray(self.data[start:start + chunk_rows], dtype=np.float32)
+            sims[start:start + chunk_rows] = chunk @ query
+        if self.scales is not None:
+            sims *= self.scales
+        return sims
+
+
+class SectionStore:
+    """
+    Read side of a store directory: len(store), store[i] (the section dict, read from disk),
+    iteration in order, store.vectors (QuantizedVectors) and store.group_ids (document index
+    of each section, numbered in order of first appearance).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "store.json")) as f:
+            self.info = json.load(f)
+        scales_path = os.path.join(path, "scales.npy")
+        self.vectors = QuantizedVectors(np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+                                        np.load(scales_path) if os.path.exists(scales_path) else None)
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.group_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        self._file = open(os.path.join(path, "sections.jsonl"), "rb")
+
+    @staticmethod
+    def write(path, sections, embeddings, dtype="float16"):
+        # Quantize embeddings and write them with the sections; returns the opened store
+        os.makedirs(path, exist_ok=True)
+        vectors = QuantizedVectors.quantize(embeddings, dtype)
+        np.save(os.path.join(path, "vectors.npy"), vectors.data)
+        if vectors.scales is not None:
+            np.save(os.path.join(path, "scales.npy"), vectors.scales)
+        elif os.path.exists(os.path.join(path, "scales.npy")):
+            os.remove(os.path.join(path, "scales.npy"))
+
+        offsets = [0]
+        documents = {}
+        doc_ids = np.empty(len(sections), dtype=np.int32)
+        with open(os.path.join(path, "sections.jsonl"), "wb") as f:
+            for i, sec in enumerate(sections):
+                doc_ids[i] = documents.setdefault(sec["document"], len(documents))
+                line = (json.dumps(sec, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+        np.save(os.path.join(path, "offsets.npy"), np.asarray(offsets, dtype=np.uint64))
+        np.save(os.path.join(path, "doc_ids.npy"), doc_ids)
+        with open(os.path.join(path, "store.json"), "w") as f:
+            json.dump({"sections": len(sections), "dim": int(vectors.data.shape[1]) if len(sections) else 0,
+                       "dtype": dtype, "documents": list(documents)}, f)
+        return SectionStore(path)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        self._file.seek(start)
+        return json.loads(self._file.read(end - start))
+
+    def __iter__(self):
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def nbytes(self):
+        # Bytes on disk: vectors and scales, plus the metadata and text
+        return self.vectors.nbytes + os.path.getsize(os.path.join(self.path, "sections.jsonl")) \
+            + self.offsets.nbytes + self.group_ids.nbytes
+
+    def close(self):
+        self._file.close()
+
+
+def ranking_agreement(sections, embeddings, store, queries, top_k=10, keywords=None):
+    """
+    How far rank_sections over the store strays from float32 ranking on the same queries:
+    mean overlap of the top_k sets, share of queries with the identical ranked list, and the
+    largest absolute score difference over the ranked sections.
+    """
+    from utils import rank_sections
+    overlaps, identical, max_error = [], 0, 0.0
+    for query in queries:
+        exact = rank_sections(sections, embeddings, query, top_k=top_k, keywords=keywords)
+        approx = rank_sections(store, store.vectors, query, top_k=top_k, keywords=keywords)
+        key = lambda ranked: [(s["document"], s["page_number"], s["section_title"]) for s in ranked]
+        overlaps.append(len(set(key(exact)) & set(key(approx))) / max(1, len(exact)))
+        identical += key(exact) == key(approx)
+        for a, b in zip(exact, approx):
+            max_error = max(max_error, abs(float(a["score"]) - float(b["score"])))
+    n = max(1, len(queries))
+    return {"overlap": float(np.mean(overlaps)) if overlaps else 1.0, "identical": identical / n,
+            "max_score_error": max_error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a compact section store, or measure its size and accuracy")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("collections", nargs="+", help="collection dirs with challenge1b_input.json and PDFs/")
+    build.add_argument("--out", required=True)
+    build.add_argument("--dtype", choices=DTYPES, default="float16")
+    compare = sub.add_parser("compare")
+    compare.add_argument("collections", nargs="+")
+    compare.add_argument("--dtype", choices=DTYPES, nargs="+", default=list(DTYPES))
+    compare.add_argument("--queries", type=int, default=100)
+    compare.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    from utils import embed_texts, extract_text_from_pdfs
+
+    sections = []
+    for collection in args.collections:
+        with open(os.path.join(collection, "challenge1b_input.json")) as f:
+            documents = json.load(f)["documents"]
+        sections.extend(extract_text_from_pdfs(os.path.join(collection, "PDFs/"), documents))
+    embeddings = embed_texts([s["text"] for s in sections])
+
+    if args.command == "build":
+        store = SectionStore.write(args.out, sections, embeddings, args.dtype)
+        print(f"✅ Stored {len(store)} sections in {args.out} ({args.dtype}, {store.nbytes() / 2**20:.1f} MiB)")
+        store.close()
+        return 0
+
+    import tempfile
+    # float32 baseline: the embedding matrix plus the section dicts' text, all resident
+    vector_bytes = np.asarray(embeddings, dtype=np.float32).nbytes
+    text_bytes = sum(len(json.dumps(s, ensure_ascii=False).encode("utf-8")) for s in sections)
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(sections), min(args.queries, len(sections)), replace=False)
+    queries = embed_texts([sections[i]["section_title"] for i in picks])
+    print(f"📦 float32: vectors {vector_bytes / 1024:.0f} KiB, section text {text_bytes / 1024:.0f} KiB in RAM")
+    for dtype in args.dtype:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SectionStore.write(tmp, sections, embeddings, dtype)
+            report = ranking_agreement(sections, embeddings, store, queries, top_k=args.top_k)
+            print(f"📦 {dtype}: vectors {store.vectors.nbytes / 1024:.0f} KiB "
+                  f"({vector_bytes / store.vectors.nbytes:.2f}x smaller), text on disk | "
+                  f"top-{args.top_k} overlap {report['overlap']:.3f}, identical rankings {report['identical']:.0%}, "
+                  f"max score error {report['max_score_error']:.2e}")
+            store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
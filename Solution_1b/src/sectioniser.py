@@ -0,0 +1,76 @@
+from collections import Counter
+
+import fitz  # PyMuPDF
+
+from layout import TEXT_ONLY_FLAGS, heading_candidate, heading_decision, read_page
+
+TITLE_END = (".", ",", ";", ":", "-")
+
+
+def _body_size(page):
+    # Size carrying the most characters; layout.body_size counts spans, so bullet glyphs can outvote the text
+    chars = Counter()
+    for line in page.lines:
+        chars[line.size] += len(line.text)
+    return chars.most_common(1)[0][0] if chars else None
+
+
+def _standalone_title(line, gap, spacing):
+    # Short capitalised line set off from the text above it: a heading in PDFs without font cues
+    words = line.text.split()
+    return (len(words) <= 8 and line.text[0].isupper() and not line.text.endswith(TITLE_END)
+            and gap > spacing * 1.5)
+
+
+def _is_heading(line, body, gap, spacing):
+    if not any(c.isalpha() for c in line.text):
+        return False
+    if heading_candidate(line, body) and heading_decision(line, llm_strong=False):
+        return True
+    return _standalone_title(line, gap, spacing)
+
+
+def iter_sections(pdf_path, filename, min_chars=200):
+    """
+    Yield the sections of one PDF in reading order, split at headings instead of capitalised lines.
+
+    Each page is read with one text-only get_text("dict") pass (layout.read_page; pages without fonts,
+    such as scans, are skipped). Headings are lines that
+    pass Solution_1a's font-size/bold rules (without its model check), or short capitalised lines
+    separated from the previous line by a wider than usual gap. A section runs from one heading
+    to the next, across page breaks, and is numbered with the page of its heading. A heading that
+    arrives while the open section is still shorter than min_chars is folded into it, so stacked
+    headings and short preambles become one section instead of being dropped.
+    """
+    current = None
+    with fitz.open(pdf_path) as pdf:
+        for page_num in range(len(pdf)):
+            _, page = read_page(pdf[page_num], flags=TEXT_ONLY_FLAGS)
+            lines = [line for line in page.lines if line.text]
+            body = _body_size(page)
+            gaps = [b.y - a.y for a, b in zip(lines, lines[1:]) if b.y > a.y]
+            spacing = sorted(gaps)[len(gaps) // 2] if gaps else 0.0
+            previous_y = None
+            for line in lines:
+                # The first line of a page counts as set off
+                gap = line.y - previous_y if previous_y is not None else float("inf")
+                previous_y = line.y
+                is_heading = _is_heading(line, body, gap, spacing)
+                if current is None or (is_heading and current["chars"] > min_chars):
+                    if current is not None:
+                        yield _finish(current)
+                    current = {"document": filename, "page_number": page_num + 1,
+                               "section_title": line.text, "lines": [], "chars": 0}
+                current["lines"].append(line.text)
+                current["chars"] += len(line.text)
+    if current is not None and current["chars"] > min_chars:
+        yield _finish(current)
+
+
+def _finish(section):
+    return {
+        "document": section["document"],
+        "page_number": section["page_number"],
+        "section_title": section["section_title"],
+        "text": "\n".join(section["lines"])
+    }
@@ -0,0 +1,129 @@
+"""
+Token-budget batching for the section encoder.
+
+Texts are tokenized once, sorted by token count and packed into batches whose padded size
+(rows x longest row) stays under a token budget, so short sections are not padded to the length
+of a whole page. Texts longer than the model's window are either truncated (what
+SentenceTransformer.encode does) or split into overlapping windows whose embeddings are averaged,
+weighted by window length, back into one vector per text.
+"""
+import time
+
+import numpy as np
+
+
+class EncodeStats:
+    # Running totals over every encode_texts call: real vs padded tokens and time in the model
+    def __init__(self):
+        self.texts = 0
+        self.windows = 0
+        self.split_texts = 0
+        self.batches = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.seconds = 0.0
+
+    def padding_efficiency(self):
+        return self.tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def tokens_per_second(self):
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            "texts": self.texts,
+            "windows": self.windows,
+            "split_texts": self.split_texts,
+            "batches": self.batches,
+            "tokens": self.tokens,
+            "padded_tokens": self.padded_tokens,
+            "padding_efficiency": self.padding_efficiency(),
+            "tokens_per_second": self.tokens_per_second(),
+        }
+
+
+def token_windows(ids, size, overlap):
+    # Windows of at most `size` token ids, consecutive windows sharing `overlap` ids
+    if len(ids) <= size:
+        return [ids]
+    stride = max(1, size - overlap)
+    starts = list(range(0, len(ids) - size, stride)) + [len(ids) - size]
+    return [ids[s:s + size] for s in starts]
+
+
+def plan_batches(lengths, token_budget):
+    # Indices grouped into batches in increasing length; each batch's rows x max length <= token_budget
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, batch = [], []
+    for i in order:
+        # Sorted ascending, so the newest row is the longest of its batch
+        if batch and (len(batch) + 1) * lengths[i] > token_budget:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def encode_texts(texts, tokenizer, forward, max_length, token_budget=2048, window=False, overlap=64,
+                 normalize=True, stats=None):
+    """
+    Embed texts with forward(input_ids, attention_mask) -> (rows, dim) float array, where both
+    inputs are int64 arrays of shape (rows, padded length) that already include the special tokens.
+
+    Inputs longer than max_length tokens are truncated, or with window=True cut into windows of
+    max_length tokens overlapping by `overlap` whose embeddings are averaged (weighted by token
+    count) and, with normalize, L2-normalised again. stats (an EncodeStats) collects token counts.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    size = max_length - 2  # room for [CLS] and [SEP]
+    ids = tokenizer(texts, add_special_tokens=False, truncation=False, verbose=False)["input_ids"]
+
+    # Rows to encode: one per text, or one per window; owner[r] is the text of row r
+    rows, owner = [], []
+    for t, text_ids in enumerate(ids):
+        pieces = token_windows(text_ids, size, overlap) if window else [text_ids[:size]]
+        rows.extend([tokenizer.cls_token_id] + p + [tokenizer.sep_token_id] for p in pieces)
+        owner.extend([t] * len(pieces))
+    lengths = [len(r) for r in rows]
+
+    row_embs = None
+    start = time.perf_counter()
+    batches = plan_batches(lengths, token_budget)
+    for batch in batches:
+        width = max(lengths[i] for i in batch)
+        input_ids = np.full((len(batch), width), tokenizer.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+        for j, i in enumerate(batch):
+            input_ids[j, :lengths[i]] = rows[i]
+            attention_mask[j, :lengths[i]] = 1
+        emb = np.asarray(forward(input_ids, attention_mask), dtype=np.float32)
+        if row_embs is None:
+            row_embs = np.zeros((len(rows), emb.shape[1]), dtype=np.float32)
+        row_embs[batch] = emb
+    elapsed = time.perf_counter() - start
+
+    owner = np.asarray(owner)
+    if len(rows) == len(texts):
+        out = row_embs
+    else:
+        # Token-weighted mean of each text's windows
+        weights = np.asarray(lengths, dtype=np.float32)[:, np.newaxis]
+        out = np.zeros((len(texts), row_embs.shape[1]), dtype=np.float32)
+        np.add.at(out, owner, row_embs * weights)
+        out /= np.bincount(owner, weights=weights[:, 0], minlength=len(texts))[:, np.newaxis].astype(np.float32)
+        if normalize:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+    if stats is not None:
+        stats.texts += len(texts)
+        stats.windows += len(rows)
+        stats.split_texts += int(np.sum(np.bincount(owner) > 1))
+        stats.batches += len(batches)
+        stats.tokens += sum(lengths)
+        stats.padded_tokens += sum(len(b) * max(lengths[i] for i in b) for b in batches)
+        stats.seconds += elapsed
+    return out
@@ -2,66 +2,395 @@ import fitz  # PyMuPDF
 import re
 import numpy as np
 import os
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
 from collections import Counter
+from functools import lru_cache
+from embedding_cache import EmbeddingCache, model_fingerprint
+from layout import triage_page
+from onnx_backend import OnnxEncoder, backend_id, compare_encoders, export_onnx, validate_backend
+import profiling
+from sectioniser import iter_sections
+from token_batching import EncodeStats, encode_texts
 
-MODEL = SentenceTransformer( os.path.join(os.path.dirname(__file__), "local_model"))
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "local_model")
+ONNX_DIR = os.path.join(os.path.dirname(__file__), "onnx_model")
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "embedding_cache")
 
-def extract_text_from_pdfs(pdf_folder, docs):
+# The SentenceTransformer is loaded by the first get_model() call; sentence_transformers and torch take
+# seconds to import, so importing this module (CLI startup, --help, PDF-only workers) stays cheap
+_MODEL = None
+_MODEL_ID = None
+_MODEL_LOCK = threading.Lock()
+# Held around every encoder call: the tokenizer and ENCODE_STATS are shared by concurrent callers
+# (the warm-start service runs collection jobs on several threads), and fast tokenizers are not reentrant
+_ENCODE_LOCK = threading.Lock()
+
+# Inference backend selected by set_backend(); ENCODER is the ONNX Runtime encoder, None for eager torch
+BACKEND = "torch"
+ENCODER = None
+
+# How PDFs are cut into sections: "lines" splits pages at capitalised lines, "outline" at detected headings
+SECTIONISERS = ("lines", "outline")
+SECTIONISER = "lines"
+
+# Encoder batches hold at most TOKEN_BUDGET padded tokens. Sections longer than the model's
+# max_seq_length are truncated, or with LONG_SECTIONS = "window" embedded as overlapping windows
+LONG_SECTIONS_MODES = ("truncate", "window")
+LONG_SECTIONS = "truncate"
+TOKEN_BUDGET = 2048
+ENCODE_STATS = EncodeStats()
+
+# Section embeddings persist across runs, keyed by model identity + normalized text (see get_cache)
+_CACHE = None
+
+
+def get_model():
+    """
+    The shared SentenceTransformer from local_model/, loaded once on first use (thread-safe).
+    """
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                from sentence_transformers import SentenceTransformer
+                _MODEL = SentenceTransformer(MODEL_DIR)
+    return _MODEL
+
+
+def model_id():
+    # Fingerprint of local_model/ plus the backend and long-section handling, which change the embeddings
+    global _MODEL_ID
+    if _MODEL_ID is None:
+        _MODEL_ID = model_fingerprint(MODEL_DIR)
+    suffix = "" if BACKEND == "torch" else f"-{backend_id(BACKEND)}"
+    return _MODEL_ID + suffix + ("-window" if LONG_SECTIONS == "window" else "")
+
+
+def get_cache():
+    # The embedding cache of the selected backend, opened on first use
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = EmbeddingCache(CACHE_DIR, model_id(), get_model().get_sentence_embedding_dimension())
+    return _CACHE
+
+
+def set_backend(backend, experimental=False):
+    """
+    Select the inference backend used by embed_texts: "torch" or "onnx", or with experimental=True
+    also "onnx-int8", which fails check_backend.
+    The ONNX graph is exported once into onnx_model/ and reused on later runs.
+    """
+    global BACKEND, ENCODER, _CACHE
+    validate_backend(backend, experimental)
+    ENCODER = None
+    if backend != "torch":
+        from sentence_transformers.models import Normalize
+        model = get_model()
+        transformer = model[0]
+        onnx_path = export_onnx(lambda: transformer.auto_model, transformer.tokenizer,
+                                os.path.join(ONNX_DIR, model_fingerprint(MODEL_DIR)),
+                                quantize=backend == "onnx-int8")
+        ENCODER = OnnxEncoder(onnx_path, transformer.tokenizer, pooling="mean",
+                              normalize=any(isinstance(m, Normalize) for m in model),
+                              max_length=model.max_seq_length)
+    BACKEND = backend
+    _CACHE = None
+
+
+def set_encoding(long_sections="truncate", token_budget=2048):
+    global LONG_SECTIONS, TOKEN_BUDGET, _CACHE
+    if long_sections not in LONG_SECTIONS_MODES:
+        raise ValueError(f"Unknown long-section mode {long_sections!r}, expected one of {LONG_SECTIONS_MODES}")
+    LONG_SECTIONS = long_sections
+    TOKEN_BUDGET = token_budget
+    _CACHE = None
+
+
+def set_sectioniser(sectioniser):
+    global SECTIONISER
+    if sectioniser not in SECTIONISERS:
+        raise ValueError(f"Unknown sectioniser {sectioniser!r}, expected one of {SECTIONISERS}")
+    SECTIONISER = sectioniser
+
+
+def _torch_forward(input_ids, attention_mask):
+    import torch
+    features = {"input_ids": torch.from_numpy(input_ids), "attention_mask": torch.from_numpy(attention_mask),
+                "token_type_ids": torch.zeros_like(torch.from_numpy(input_ids))}
+    with torch.no_grad():
+        return get_model()(features)["sentence_embedding"].numpy()
+
+
+def _encode(texts):
+    # Length-sorted batches under TOKEN_BUDGET (token_batching.encode_texts), through ONNX Runtime or torch
+    from sentence_transformers.models import Normalize
+    profiling.count("model_calls")
+    profiling.count("model_texts", len(texts))
+    with profiling.stage("model"), _ENCODE_LOCK:
+        model = get_model()
+        tokens = ENCODE_STATS.tokens
+        embeddings = encode_texts(texts, model.tokenizer, ENCODER.forward if ENCODER is not None else _torch_forward,
+                                  model.max_seq_length, TOKEN_BUDGET, window=LONG_SECTIONS == "window",
+                                  normalize=any(isinstance(m, Normalize) for m in model), stats=ENCODE_STATS)
+        profiling.count("tokens", ENCODE_STATS.tokens - tokens)
+        return embeddings
+
+
+def check_backend(texts):
+    # Compare the selected backend against get_model().encode; returns the compare_encoders report
+    return compare_encoders(get_model().encode, _encode, texts)
+
+def extract_text_from_pdf(pdf_path, filename, sectioniser=None):
+    # Sections of one PDF: capitalised-line splits of each page longer than 200 characters,
+    # or with the "outline" sectioniser, heading-to-heading sections (sectioniser.iter_sections)
+    if (sectioniser or SECTIONISER) == "outline":
+        with profiling.stage("sectionise"):
+            sections = list(iter_sections(pdf_path, filename))
+        profiling.count("sections", len(sections))
+        return sections
     sections = []
-    for doc in docs:
-        pdf_path = os.path.join(pdf_folder, doc["filename"])
+    with profiling.stage("open"):
         pdf = fitz.open(pdf_path)
-        for page_num in range(len(pdf)):
-            page = pdf[page_num]
+    for page_num in range(len(pdf)):
+        page = pdf[page_num]
+        # Pages without fonts (scans, blank pages) have no text to extract
+        kind = triage_page(page)
+        profiling.count(f"pages_{kind}")
+        if kind != "text":
+            continue
+        with profiling.stage("get_text"):
             text = page.get_text()
+        with profiling.stage("split"):
             splits = re.split(r'\n(?=[A-Z][^\n]{3,})', text)
             for part in splits:
                 if len(part.strip()) > 200:
                     sections.append({
-                        "document": doc["filename"],
+                        "document": filename,
                         "page_number": page_num + 1,
                         "section_title": part.split('\n')[0].strip(),
                         "text": part.strip()
                     })
+    profiling.count("pages", len(pdf))
+    profiling.count("sections", len(sections))
     return sections
 
-def embed_texts(texts):
-    return MODEL.encode(texts)
+def extract_text_from_pdfs(pdf_folder, docs):
+    sections = []
+    for doc in docs:
+        sections.extend(extract_text_from_pdf(os.path.join(pdf_folder, doc["filename"]), doc["filename"]))
+    return sections
+
+def embed_texts(texts, use_cache=True):
+    with profiling.stage("embed"):
+        if not use_cache:
+            return _encode(texts)
+        cache = get_cache()
+        misses = cache.misses
+        embeddings = cache.embed(texts, _encode)
+        profiling.count("cache_hits", len(texts) - (cache.misses - misses))
+        return embeddings
+
+def section_settings():
+    # Everything besides the PDF bytes that changes a document's sections or their embeddings
+    return {"model": model_id(), "sectioniser": SECTIONISER}
+
+def extract_documents(pdf_folder, docs, manifest=None):
+    # Per-document (sections, embeddings) parts; embeddings is None where the document still needs embedding
+    parts = []
+    for doc in docs:
+        cached = manifest.get(doc["filename"]) if manifest is not None else None
+        if cached is None:
+            cached = (extract_text_from_pdf(os.path.join(pdf_folder, doc["filename"]), doc["filename"]), None)
+        parts.append(cached)
+    return parts
+
+def pending_texts(parts):
+    return [s["text"] for sections, embeddings in parts if embeddings is None for s in sections]
+
+def join_documents(docs, parts, new_embeddings, manifest=None):
+    """
+    Concatenate per-document parts in docs order. Parts without embeddings take theirs, in order,
+    from new_embeddings (the embedded pending_texts) and are recorded in the manifest.
+    Returns (sections, section_embeddings).
+    """
+    sections, blocks, offset = [], [], 0
+    for doc, (doc_sections, doc_embeddings) in zip(docs, parts):
+        if doc_embeddings is None:
+            doc_embeddings = np.asarray(new_embeddings[offset:offset + len(doc_sections)], dtype=np.float32)
+            offset += len(doc_sections)
+            if manifest is not None:
+                manifest.put(doc["filename"], doc_sections, doc_embeddings)
+        sections.extend(doc_sections)
+        blocks.append(doc_embeddings.reshape(len(doc_sections), get_cache().dim))
+    if not blocks:
+        return sections, np.zeros((0, get_cache().dim), dtype=np.float32)
+    return sections, np.concatenate(blocks)
+
+WORD_RE = re.compile(r"\w+")
+
+@lru_cache(maxsize=64)
+def _compile_keywords(keywords):
+    # Plain-word keywords are counted from a single tokenisation of each text; anything else
+    # (phrases, punctuation) keeps its own \b...\b regex
+    words = Counter()
+    patterns = []
+    for k in keywords:
+        if WORD_RE.fullmatch(k):
+            words[k] += 1
+        else:
+            patterns.append(re.compile(rf"\b{k}\b"))
+    return dict(words), patterns
+
+def keyword_hits(texts, keywords):
+    """
+    Count keyword occurrences in each lowercased text, same as summing
+    len(re.findall(rf"\\b{k}\\b", text.lower())) over the keywords.
+    A word keyword can only match a whole \\w+ run, so all of them are counted in one pass
+    over the text's tokens instead of one regex scan per keyword.
+    """
+    words, patterns = _compile_keywords(tuple(keywords))
+    hits = []
+    for text in texts:
+        text = text.lower()
+        n = sum(words.get(token, 0) for token in WORD_RE.findall(text)) if words else 0
+        for pattern in patterns:
+            n += len(pattern.findall(text))
+        hits.append(n)
+    return hits
+
+def normalize_rows(matrix):
+    # L2-normalise rows exactly like sklearn's cosine_similarity does; all-zero rows stay zero
+    matrix = np.asarray(matrix)
+    if matrix.dtype not in (np.float32, np.float64):
+        matrix = matrix.astype(np.float64)
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    norms[norms == 0.0] = 1.0
+    return matrix / norms[:, np.newaxis]
+
+def top_per_group(scores, group_ids, per_group):
+    """
+    Indices of the `per_group` best scores of every group, picked with np.partition instead of
+    sorting each group. Ties at the cut-off keep the lower indices, like a stable descending sort.
+    """
+    order = np.argsort(group_ids, kind="stable")
+    bounds = np.flatnonzero(np.diff(group_ids[order])) + 1
+    winners = []
+    for members in np.split(order, bounds):
+        if len(members) <= per_group:
+            winners.append(members)
+            continue
+        member_scores = scores[members]
+        cutoff = np.partition(member_scores, len(members) - per_group)[len(members) - per_group]
+        above = members[member_scores > cutoff]
+        tied = members[member_scores == cutoff][:per_group - len(above)]
+        winners.append(np.concatenate([above, tied]))
+    return np.concatenate(winners) if winners else np.zeros(0, dtype=np.int64)
+
+def _document_groups(sections):
+    # Document index of every section, numbered in order of first appearance
+    doc_ids = {}
+    return np.array([doc_ids.setdefault(sec["document"], len(doc_ids)) for sec in sections])
+
+# Sections of a SectionStore read from disk for the keyword bonus, most similar first
+STORE_SHORTLIST = 500
+
+def _keyword_bonus(texts, keywords):
+    hits = np.asarray(keyword_hits(texts, keywords))
+    return 0.3 * np.minimum(1.0, hits * 0.1)
+
+def _select(sections, scores, group_ids, top_k, top_per_doc):
+    candidates = top_per_group(scores, group_ids, top_per_doc)
+    # Highest score first; ties in document order, then section order
+    order = np.lexsort((candidates, group_ids[candidates], -scores[candidates]))[:top_k]
+    return [dict(sections[i], score=scores[i]) for i in candidates[order]]
+
+def _rank_store_shortlist(store, scores, group_ids, keywords, top_k, top_per_doc, shortlist=STORE_SHORTLIST):
+    # Keyword ranking over a SectionStore: only the `shortlist` most similar sections are read from
+    # disk, and the keyword bonus and per-document quota are applied to them, as in SectionIndex.query
+    candidates = np.sort(np.argsort(-scores, kind="stable")[:shortlist])
+    subset = [store[int(i)] for i in candidates]
+    profiling.count("sections_read", len(subset))
+    subset_scores = scores[candidates] + _keyword_bonus((sec["text"] for sec in subset), keywords)
+    return _select(subset, subset_scores, group_ids[candidates], top_k, top_per_doc)
 
 def rank_sections(sections, section_embeddings, task_embedding, top_k=10, top_per_doc=3, keywords=None):
-    sims = cosine_similarity([task_embedding], section_embeddings)[0]
-
-    scored_sections = []
-    for sec, sim in zip(sections, sims):
-        bonus = 0.0
-        if keywords:
-            text = sec["text"].lower()
-            keyword_hits = 0
-            for k in keywords:
-                keyword_hits += len(re.findall(rf"\b{k}\b", text))
-            bonus = min(1.0, keyword_hits * 0.1)
-
-        final_score = 0.7 * sim + 0.3 * bonus
-
-        sec_copy = sec.copy()
-        sec_copy["score"] = final_score
-        scored_sections.append(sec_copy)
-
-    # group by doc
-    doc_groups = {}
-    for sec in scored_sections:
-        doc = sec["document"]
-        doc_groups.setdefault(doc, []).append(sec)
-
-    top_sections = []
-    for secs in doc_groups.values():
-        top_in_doc = sorted(secs, key=lambda x: x["score"], reverse=True)[:top_per_doc]
-        top_sections.extend(top_in_doc)
-
-    top_sections = sorted(top_sections, key=lambda x: x["score"], reverse=True)[:top_k]
-    return top_sections
+    """
+    Best sections for one task embedding: 0.7 x cosine similarity plus the keyword bonus, at most
+    top_per_doc per document. sections may also be a section_store.SectionStore with its
+    store.vectors as section_embeddings; the quantized vectors are then scored chunk by chunk, and
+    with keywords only the STORE_SHORTLIST most similar sections are read from disk, get the bonus
+    and compete for top_k, rather than every section's text being decoded on each query.
+    """
+    if not len(sections):
+        return []
+
+    # One matrix-vector product over normalised embeddings; scores in float64 like the old scalar loop
+    with profiling.stage("similarity"):
+        if hasattr(section_embeddings, "similarities"):
+            sims = section_embeddings.similarities(task_embedding)
+        else:
+            sims = np.dot(normalize_rows(np.asarray(task_embedding)[np.newaxis, :]),
+                          normalize_rows(section_embeddings).T)[0]
+        scores = 0.7 * sims.astype(np.float64)
+    group_ids = getattr(sections, "group_ids", None)
+    if keywords and group_ids is not None:
+        with profiling.stage("keywords"):
+            return _rank_store_shortlist(sections, scores, np.asarray(group_ids), keywords, top_k, top_per_doc)
+    group_ids = np.asarray(group_ids) if group_ids is not None else _document_groups(sections)
+    if keywords:
+        with profiling.stage("keywords"):
+            scores = scores + _keyword_bonus((sec["text"] for sec in sections), keywords)
+
+    with profiling.stage("select"):
+        return _select(sections, scores, group_ids, top_k, top_per_doc)
+
+def rank_sections_batch(sections, section_embeddings, query_embeddings, keywords=None, top_k=10, top_per_doc=3):
+    """
+    rank_sections for many queries over the same sections. Every query is scored in one
+    matrix-matrix product against the section matrix (normalised once); the keyword bonus and
+    the per-document quota are then applied per query. keywords holds one keyword list (or None)
+    per query; queries sharing a list share its keyword counts. Returns one ranking per query.
+    """
+    query_embeddings = np.asarray(query_embeddings)
+    if not sections:
+        return [[] for _ in range(len(query_embeddings))]
+    keywords = keywords if keywords is not None else [None] * len(query_embeddings)
+
+    with profiling.stage("similarity"):
+        sims = normalize_rows(query_embeddings) @ normalize_rows(section_embeddings).T
+        scores = 0.7 * sims.astype(np.float64)
+
+    texts = [sec["text"] for sec in sections]
+    group_ids = _document_groups(sections)
+    bonuses = {}
+    ranked = []
+    for row, query_keywords in zip(scores, keywords):
+        if query_keywords:
+            key = tuple(query_keywords)
+            if key not in bonuses:
+                with profiling.stage("keywords"):
+                    bonuses[key] = _keyword_bonus(texts, query_keywords)
+            row = row + bonuses[key]
+        with profiling.stage("select"):
+            ranked.append(_select(sections, row, group_ids, top_k, top_per_doc))
+    return ranked
+
+def query_text(persona, job):
+    # The text embedded for a persona and job to be done
+    return persona.lower() + " " + job
+
+def rank_queries(queries, sections, section_embeddings, keywords_for=None, top_k=10, top_per_doc=3):
+    """
+    Rank the same embedded sections for many (persona, job) queries. All query texts are
+    embedded in one embed_texts call and scored with rank_sections_batch; keywords_for(persona)
+    supplies each persona's keywords. Returns (ranked_sections, refined_subsections) per query.
+    """
+    if not queries:
+        return []
+    query_embeddings = embed_texts([query_text(persona, job) for persona, job in queries])
+    keywords = [keywords_for(persona.lower()) if keywords_for else None for persona, _ in queries]
+    ranked = rank_sections_batch(sections, section_embeddings, query_embeddings, keywords, top_k, top_per_doc)
+    return [(r, refine_subsections(r)) for r in ranked]
 
 def refine_subsections(ranked_sections):
     refined = []
@@ -77,31 +406,21 @@ def refine_subsections(ranked_sections):
                 break
     return refined
 
-def learn_new_keywords(personas, persona, sections):
+def learn_new_keywords(store, persona, sections):
     """
-    Learn new keywords from high-ranked sections.
+    Learn new keywords from high-ranked sections into the persona's KeywordStore.
     If the persona doesn't exist yet, create it.
     """
     # If this persona is new, add it
-    if persona not in personas:
+    if not store.has_persona(persona):
         print(f"🆕 Adding new persona: {persona}")
-        personas[persona] = {"keywords": []}
-
-    # Existing keywords
-    current_keywords = set(personas[persona].get("keywords", []))
 
     # Simple word extraction: lowercase words, longer than 4 chars, no digits
-    new_words = []
+    words = Counter()
     for sec in sections:
-        words = re.findall(r'\b[a-zA-Z]{5,}\b', sec["text"].lower())
-        new_words.extend(words)
-
-    # Keep only unique new keywords that aren't in existing ones
-    new_keywords = set(new_words) - current_keywords
-
-    # Update
-    updated = current_keywords.union(new_keywords)
-    personas[persona]["keywords"] = sorted(updated)
+        words.update(re.findall(r'\b[a-zA-Z]{5,}\b', sec["text"].lower()))
 
-    return personas
+    # Counted in one transaction; the store keeps only the highest-weighted learned keywords
+    store.learn(persona, words)
 
+    return store
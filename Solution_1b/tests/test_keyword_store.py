@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Check the persona keyword store: keywords age only on their own persona's learns, stores from
+before per-persona generations keep their recency scale, persona.json changes re-import the seeds,
+"learned" lists are imported as ordinary learned keywords, and old nested persona files still load.
+"""
+
+import json
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from keyword_store import KeywordStore, load_seed_personas
+
+
+def write_personas(path, personas):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"personas": personas}, f)
+
+
+def learned_counts(store, persona):
+    return dict(store._db.execute("SELECT keyword, count FROM keywords WHERE persona = ? AND seed = 0",
+                                  (persona,)).fetchall())
+
+
+def test_other_personas_do_not_age_keywords():
+    # With one global generation, 25 learns for another persona evicted the keyword seen 10 times
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KeywordStore(Path(tmp) / "keywords.sqlite", capacity=2)
+        store.learn("planner", ["frequent"] * 10)
+        for _ in range(25):
+            store.learn("chef", ["recipe"])
+        store.learn("planner", ["once", "twice"])
+        assert "frequent" in store.keywords("planner"), store.keywords("planner")
+        assert len(learned_counts(store, "planner")) == 2
+        store.close()
+    print("  ✅ a keyword seen 10 times survives 25 learns for another persona")
+
+
+def test_legacy_generation_is_the_starting_point():
+    # Stores written with the global counter only have meta.generation; last_seen is on that scale
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "keywords.sqlite"
+        KeywordStore(path).close()
+        with sqlite3.connect(path) as db:
+            db.execute("INSERT INTO meta (key, value) VALUES ('generation', '30')")
+            db.execute("INSERT INTO keywords (persona, keyword, count, last_seen) VALUES ('planner', 'old', 5, 30)")
+        store = KeywordStore(path, capacity=1)
+        store.learn("planner", ["new"])
+        assert store._generation("planner") == 31
+        assert learned_counts(store, "planner") == {"old": 5}, "the legacy keyword was aged from generation 0"
+        store.close()
+    print("  ✅ legacy stores continue from their global generation")
+
+
+def test_seed_reimport_on_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_file = Path(tmp) / "persona.json"
+        write_personas(seed_file, {"Planner": {"keywords": ["Alpha", "beta", "gamma"]}})
+        store = KeywordStore(Path(tmp) / "keywords.sqlite", seed_file=seed_file)
+        store.learn("planner", ["beta"])
+        store.close()
+
+        write_personas(seed_file, {"Planner": {"keywords": ["alpha", "delta"]}})
+        store = KeywordStore(Path(tmp) / "keywords.sqlite", seed_file=seed_file)
+        keywords = store.keywords("planner")
+        assert keywords[:2] == ["alpha", "delta"], keywords
+        assert "gamma" not in keywords, "a dropped seed was kept"
+        assert learned_counts(store, "planner") == {"beta": 1}, "a dropped seed that was learned was lost"
+        store.close()
+    print("  ✅ dropped seeds forgotten, learned ones kept")
+
+
+def test_learned_list_import():
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_file = Path(tmp) / "persona.json"
+        write_personas(seed_file, {"Planner": {"keywords": ["trip"]}})
+        store = KeywordStore(Path(tmp) / "keywords.sqlite", seed_file=seed_file)
+        store.learn("planner", ["hotel"] * 3)
+        store.close()
+
+        write_personas(seed_file, {"Planner": {"keywords": ["trip"], "learned": ["Hotel", "beach", "trip"]}})
+        store = KeywordStore(Path(tmp) / "keywords.sqlite", seed_file=seed_file)
+        assert learned_counts(store, "planner") == {"hotel": 3, "beach": 1}, learned_counts(store, "planner")
+        assert store.stats() == {"personas": 1, "seed": 1, "learned": 2}, store.stats()
+        store.close()
+    print("  ✅ \"learned\" terms imported once, known keywords untouched")
+
+
+def test_nested_persona_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_file = Path(tmp) / "persona.json"
+        with open(seed_file, "w", encoding="utf-8") as f:
+            json.dump({"personas": {"Planner": {"keywords": ["trip"]},
+                                    "personas": {"Chef": {"keywords": ["menu"]},
+                                                 "Planner": {"keywords": ["hotel"]}}}}, f)
+        seeds = load_seed_personas(seed_file)
+        assert seeds == {"planner": ["trip", "hotel"], "chef": ["menu"]}, seeds
+    print("  ✅ old nested persona files merge every level")
+
+
+def main():
+    print("🧪 Testing the persona keyword store")
+    print("=" * 50)
+    try:
+        test_other_personas_do_not_age_keywords()
+        test_legacy_generation_is_the_starting_point()
+        test_seed_reimport_on_change()
+        test_learned_list_import()
+        test_nested_persona_file()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Keyword store keeps, ages and imports keywords as intended.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Check the vectorised ranking against the original per-section loop: rank_sections picks the same
+sections in the same order, ties included; keyword_hits counts like one re.findall per keyword;
+rank_sections_batch matches rank_sections per query; and token_windows / plan_batches cover
+every token and row within their limits.
+"""
+
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from token_batching import plan_batches, token_windows
+from utils import keyword_hits, rank_sections, rank_sections_batch
+
+WORDS = ["travel", "trip", "hotel", "beach", "menu", "recipe", "vegetarian", "form", "signature",
+         "planner", "nice", "cannes", "budget", "friends", "r&d", "e-mail", "check-in"]
+CASES = 300
+
+
+def reference_rank_sections(sections, section_embeddings, task_embedding, top_k=10, top_per_doc=3, keywords=None):
+    # rank_sections as it was before vectorisation
+    sims = cosine_similarity([task_embedding], section_embeddings)[0]
+
+    scored_sections = []
+    for sec, sim in zip(sections, sims):
+        bonus = 0.0
+        if keywords:
+            text = sec["text"].lower()
+            keyword_hits = 0
+            for k in keywords:
+                keyword_hits += len(re.findall(rf"\b{k}\b", text))
+            bonus = min(1.0, keyword_hits * 0.1)
+
+        final_score = 0.7 * sim + 0.3 * bonus
+
+        sec_copy = sec.copy()
+        sec_copy["score"] = final_score
+        scored_sections.append(sec_copy)
+
+    doc_groups = {}
+    for sec in scored_sections:
+        doc_groups.setdefault(sec["document"], []).append(sec)
+
+    top_sections = []
+    for secs in doc_groups.values():
+        top_sections.extend(sorted(secs, key=lambda x: x["score"], reverse=True)[:top_per_doc])
+    return sorted(top_sections, key=lambda x: x["score"], reverse=True)[:top_k]
+
+
+def random_text(rng, n_words):
+    # Lower- and title-case keywords with punctuation around them, between filler words
+    filler = ["the", "and", "stay", "guide", "travels", "hotels", "menus", "planner's", "trip-planning"]
+    pool = WORDS + [w.title() for w in WORDS] + filler
+    words = rng.choice(pool, n_words)
+    return " ".join(w + rng.choice(["", "", ",", ".", ":", "!"]) for w in words)
+
+
+def random_library(rng):
+    n = int(rng.integers(1, 60))
+    docs = [f"doc{i}.pdf" for i in range(int(rng.integers(1, 8)))]
+    sections = [{"document": str(rng.choice(docs)), "page_number": i + 1, "section_title": f"s{i}",
+                 "text": random_text(rng, int(rng.integers(5, 40)))} for i in range(n)]
+    embeddings = rng.normal(size=(n, 8)).astype(np.float32)
+    if rng.random() < 0.5:
+        # Few distinct similarities, so many scores tie
+        embeddings = np.round(embeddings, 0)
+        embeddings[np.all(embeddings == 0, axis=1), 0] = 1.0
+    if rng.random() < 0.3 and n > 1:
+        embeddings[n // 2:] = embeddings[:n - n // 2]
+    return sections, embeddings
+
+
+def ranking_key(ranked):
+    return [(s["section_title"], s["document"]) for s in ranked]
+
+
+def test_rank_sections_matches_reference():
+    rng = np.random.default_rng(0)
+    for case in range(CASES):
+        sections, embeddings = random_library(rng)
+        task = rng.normal(size=8).astype(np.float32)
+        if rng.random() < 0.3:
+            task = np.round(task, 0) + np.float32(0.5)
+        keywords = list(rng.choice(WORDS, int(rng.integers(1, 6)), replace=False)) if rng.random() < 0.7 else None
+        top_k, top_per_doc = int(rng.integers(1, 15)), int(rng.integers(1, 5))
+
+        expected = reference_rank_sections(sections, embeddings, task, top_k, top_per_doc, keywords)
+        actual = rank_sections(sections, embeddings, task, top_k, top_per_doc, keywords)
+        assert ranking_key(actual) == ranking_key(expected), f"case {case}: order differs"
+        assert np.allclose([s["score"] for s in actual], [s["score"] for s in expected], rtol=0, atol=1e-6), \
+            f"case {case}: scores differ"
+    print(f"  ✅ rank_sections matches the per-section loop on {CASES} libraries, ties included")
+
+
+def test_keyword_hits_matches_findall():
+    rng = np.random.default_rng(1)
+    for case in range(CASES):
+        texts = [random_text(rng, int(rng.integers(0, 30))) for _ in range(5)]
+        keywords = list(rng.choice(WORDS, int(rng.integers(1, 8)), replace=False))
+        expected = [sum(len(re.findall(rf"\b{k}\b", text.lower())) for k in keywords) for text in texts]
+        assert keyword_hits(texts, keywords) == expected, f"case {case}: {keywords}"
+    print(f"  ✅ keyword_hits matches one re.findall per keyword on {CASES} cases")
+
+
+def test_batch_matches_single_queries():
+    rng = np.random.default_rng(2)
+    for case in range(CASES // 3):
+        sections, embeddings = random_library(rng)
+        queries = rng.normal(size=(int(rng.integers(1, 6)), 8)).astype(np.float32)
+        shared = list(rng.choice(WORDS, 3, replace=False))
+        keywords = [shared if rng.random() < 0.5 else (None if rng.random() < 0.3 else
+                    list(rng.choice(WORDS, 2, replace=False))) for _ in queries]
+        batched = rank_sections_batch(sections, embeddings, queries, keywords, top_k=7, top_per_doc=2)
+        for q, kw, ranked in zip(queries, keywords, batched):
+            single = rank_sections(sections, embeddings, q, top_k=7, top_per_doc=2, keywords=kw)
+            assert ranking_key(ranked) == ranking_key(single), f"case {case}: batched order differs"
+            # One matrix-matrix product instead of matrix-vector ones: float32 rounding moves scores by ~1e-8
+            assert np.allclose([s["score"] for s in ranked], [s["score"] for s in single], rtol=0, atol=1e-6), \
+                f"case {case}: scores differ"
+    print(f"  ✅ rank_sections_batch matches rank_sections per query on {CASES // 3} libraries")
+
+
+def test_token_windows():
+    for length in range(0, 60):
+        ids = list(range(length))
+        for size, overlap in [(8, 2), (8, 0), (5, 4), (3, 5)]:
+            windows = token_windows(ids, size, overlap)
+            assert all(len(w) <= size for w in windows), (length, size, overlap)
+            assert windows[0][:1] == ids[:1] and windows[-1][-1:] == ids[-1:], (length, size, overlap)
+            # Contiguous runs of ids that together cover every id
+            assert all(w == ids[w[0]:w[0] + len(w)] for w in windows if w)
+            assert sorted(set(i for w in windows for i in w)) == ids
+            if length <= size:
+                assert windows == [ids]
+            else:
+                assert all(len(w) == size for w in windows)
+                starts = [w[0] for w in windows]
+                # Every window but the last advances by the stride; the last ends at the final id
+                assert all(b - a == max(1, size - overlap) for a, b in zip(starts, starts[1:-1]))
+                assert 0 < starts[-1] - starts[-2] <= max(1, size - overlap)
+    print("  ✅ token_windows cover every token in windows of at most `size`")
+
+
+def test_plan_batches():
+    rng = np.random.default_rng(3)
+    for case in range(CASES):
+        lengths = list(rng.integers(1, 300, int(rng.integers(0, 80))))
+        budget = int(rng.integers(64, 4096))
+        batches = plan_batches(lengths, budget)
+        assert sorted(i for b in batches for i in b) == list(range(len(lengths))), f"case {case}: rows lost"
+        for batch in batches:
+            assert len(batch) == 1 or len(batch) * max(lengths[i] for i in batch) <= budget, f"case {case}"
+        flat = [lengths[i] for b in batches for i in b]
+        assert flat == sorted(flat), f"case {case}: batches not in increasing length"
+        # Greedy packing: the next batch's first row would have pushed the previous one over budget
+        for prev, nxt in zip(batches, batches[1:]):
+            assert (len(prev) + 1) * lengths[nxt[0]] > budget, f"case {case}: batch closed early"
+    print(f"  ✅ plan_batches keeps every row once and every batch within budget on {CASES} cases")
+
+
+def main():
+    print("🧪 Testing section ranking")
+    print("=" * 50)
+    try:
+        test_rank_sections_matches_reference()
+        test_keyword_hits_matches_findall()
+        test_batch_matches_single_queries()
+        test_token_windows()
+        test_plan_batches()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("\n🎉 Vectorised ranking matches the per-section loop.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Stage timings for both pipelines on synthetic PDFs, with regression checks against a baseline.
+
+For each page count, a corpus of synthetic PDFs (synthetic_pdfs.py) is generated and run through
+    1a: extract_title, the page loop (page triage, parse_page + candidate filters), heading classification,
+        model inference (the part of classification spent in the encoder) and extract_outline end to end.
+        Classification runs with the cascade off, so every candidate reaches the encoder and inference
+        is measured; extract_outline keeps the cascade
+    1b: section extraction, embedding and ranking
+Every stage is run --repeat times and the fastest time is kept. Embedding caches are bypassed so
+the model always runs. The "startup" scenario tracks cold start of both entry points: the
+cumulative `python -X importtime` of process_pdfs / app, and the wall time of `--help`.
+
+    python benchmarks/bench_pipelines.py --pages 10 50 --out benchmarks/results.json
+    python benchmarks/bench_pipelines.py --pages 10 50 --baseline benchmarks/baseline.json --threshold 0.2
+
+With --baseline, exits 1 when a stage got slower than baseline * (1 + threshold) by more than
+--min-delta seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "Solution_1a"))
+sys.path.insert(0, str(ROOT / "Solution_1b" / "src"))
+
+from synthetic_pdfs import WORDS, generate_corpus
+
+
+def bench_1a(pdf_paths, batch_size, backend):
+    import fitz
+    from pdf_outliner.extractor import PDFOutlineExtractor
+
+    extractor = PDFOutlineExtractor(batch_size=batch_size, cache_dir=None, backend=backend)
+    times = {"extract_title_s": 0.0, "page_loop_s": 0.0, "classify_s": 0.0, "inference_s": 0.0,
+             "extract_outline_s": 0.0}
+    counts = {"pages": 0, "candidates": 0, "headings": 0, "inferences": 0}
+
+    # Time the encoder from inside classification by shadowing the bound method
+    encode = extractor._encode
+
+    def timed_encode(texts):
+        start = time.perf_counter()
+        try:
+            return encode(texts)
+        finally:
+            times["inference_s"] += time.perf_counter() - start
+
+    extractor._encode = timed_encode
+    # The heuristics accept every synthetic heading on their own; without the cascade the model sees them all
+    extractor.cascade = False
+    for pdf_path in pdf_paths:
+        start = time.perf_counter()
+        doc = fitz.open(pdf_path)
+        first_page = extractor._parse_page(doc[0], body_only=False)
+        title = extractor.extract_title(doc, first_page)
+        times["extract_title_s"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        pages = [(pno, extractor._page_candidates(first_page if pno == 0 else extractor._parse_page(doc[pno]), pno, title.strip()))
+                 for pno in range(len(doc))]
+        times["page_loop_s"] += time.perf_counter() - start
+        counts["pages"] += len(doc)
+        counts["candidates"] += sum(len(c) for _, c in pages)
+        doc.close()
+
+        start = time.perf_counter()
+        classified = extractor._classify_pages(pages)
+        times["classify_s"] += time.perf_counter() - start
+        counts["headings"] += sum(len(c) for _, c in classified)
+    extractor._encode = encode
+    extractor.cascade = True
+    counts["inferences"] = extractor.inferences_run
+
+    for pdf_path in pdf_paths:
+        start = time.perf_counter()
+        extractor.extract_outline(pdf_path)
+        times["extract_outline_s"] += time.perf_counter() - start
+    return times, counts
+
+
+def bench_1b(pdf_paths):
+    import utils
+
+    pdf_folder = str(pdf_paths[0].parent) + os.sep
+    docs = [{"filename": p.name} for p in pdf_paths]
+    times = {}
+    utils.get_model()  # loaded lazily; keep the one-off load out of the embedding stage
+
+    start = time.perf_counter()
+    sections = utils.extract_text_from_pdfs(pdf_folder, docs)
+    times["extraction_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    task_embedding = utils.embed_texts(["travel planner plan a regional itinerary"], use_cache=False)[0]
+    section_embeddings = utils.embed_texts([s["text"] for s in sections], use_cache=False)
+    times["embedding_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    utils.rank_sections(sections, section_embeddings, task_embedding, keywords=WORDS[:10])
+    times["ranking_s"] = time.perf_counter() - start
+    return times, {"sections": len(sections)}
+
+
+ENTRY_POINTS = {"1a": (ROOT / "Solution_1a", "process_pdfs"), "1b": (ROOT / "Solution_1b" / "src", "app")}
+
+
+def bench_startup(pipeline):
+    # Cold start of an entry point, each in a fresh interpreter
+    cwd, module = ENTRY_POINTS[pipeline]
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                          capture_output=True, text=True, check=True)
+    # importtime lines are "import time: self [us] | cumulative | name"; the entry point is reported last
+    match = re.search(rf"\|\s*(\d+)\s*\|\s*{module}\s*$", proc.stderr, re.MULTILINE)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, f"{module}.py", "--help"], cwd=cwd, capture_output=True, check=True)
+    help_s = time.perf_counter() - start
+    return {"import_s": int(match.group(1)) / 1e6, "help_s": help_s}, {}
+
+
+def best_of(repeat, fn, *args):
+    # Fastest time per stage over `repeat` runs; counts come from the last run
+    best = None
+    for _ in range(repeat):
+        times, counts = fn(*args)
+        best = times if best is None else {k: min(best[k], v) for k, v in times.items()}
+    return {k: round(v, 6) for k, v in best.items()}, counts
+
+
+def compare(results, baseline, threshold, min_delta):
+    # (scenario, pipeline, stage, baseline_s, current_s, regressed) for every stage in both files
+    rows = []
+    for scenario, pipelines in results["scenarios"].items():
+        for pipeline, entry in pipelines.items():
+            base_entry = baseline.get("scenarios", {}).get(scenario, {}).get(pipeline)
+            if base_entry is None:
+                continue
+            for stage, current in entry["times"].items():
+                base = base_entry["times"].get(stage)
+                if base is None:
+                    continue
+                regressed = current > base * (1 + threshold) and current - base > min_delta
+                rows.append((scenario, pipeline, stage, base, current, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark both pipelines on synthetic PDFs")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50], help="page counts to benchmark")
+    parser.add_argument("--docs", type=int, default=3, help="PDFs per scenario (default: 3)")
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--headings-per-page", type=int, default=2)
+    parser.add_argument("--pipelines", nargs="+", choices=("1a", "1b"), default=["1a", "1b"])
+    parser.add_argument("--skip-startup", action="store_true", help="don't measure entry-point cold start")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backend", choices=("torch", "onnx"), default="torch")
+    parser.add_argument("--out", type=Path, default=Path(__file__).resolve().parent / "results.json")
+    parser.add_argument("--baseline", type=Path, default=None, help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown ratio (default: 0.2)")
+    parser.add_argument("--min-delta", type=float, default=0.01,
+                        help="ignore slowdowns smaller than this many seconds (default: 0.01)")
+    args = parser.parse_args()
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "cpus": os.cpu_count()},
+        "scenarios": {},
+    }
+    if not args.skip_startup:
+        results["scenarios"]["startup"] = {}
+        for pipeline in args.pipelines:
+            times, counts = best_of(args.repeat, bench_startup, pipeline)
+            results["scenarios"]["startup"][pipeline] = {"times": times, "counts": counts}
+            print(f"⏱️  startup {pipeline}: import {times['import_s']:.3f}s | --help {times['help_s']:.3f}s")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_paths = generate_corpus(Path(tmp) / f"pages_{pages}", docs=args.docs, pages=pages,
+                                        lines_per_page=args.lines_per_page,
+                                        headings_per_page=args.headings_per_page)
+            scenario = f"pages={pages}"
+            results["scenarios"][scenario] = {}
+            for pipeline in args.pipelines:
+                if pipeline == "1a":
+                    times, counts = best_of(args.repeat, bench_1a, pdf_paths, args.batch_size, args.backend)
+                else:
+                    times, counts = best_of(args.repeat, bench_1b, pdf_paths)
+                results["scenarios"][scenario][pipeline] = {"times": times, "counts": counts}
+                stages = " | ".join(f"{k[:-2]} {v:.3f}s" for k, v in times.items())
+                print(f"⏱️  {scenario} {pipeline}: {stages}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"✅ Results written to {args.out}")
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold, args.min_delta)
+    for scenario, pipeline, stage, base, current, regressed in rows:
+        status = "❌" if regressed else "✅"
+        print(f"{status} {scenario} {pipeline} {stage[:-2]}: {base:.3f}s -> {current:.3f}s ({current / max(base, 1e-9):.2f}x)")
+    regressions = sum(r[-1] for r in rows)
+    print(f"{'❌' if regressions else '✅'} {regressions} regression(s) over {len(rows)} stage(s) "
+          f"at threshold {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Synthetic PDFs for benchmarking both pipelines.
+
+Each document has a large title on page 1, a font-size hierarchy of headings (H1 > H2 > H3,
+bold), body text at a configurable density, and optional running headers/footers that the
+outline extractor is expected to filter out.
+
+    python benchmarks/synthetic_pdfs.py out_dir --docs 3 --pages 50
+"""
+import argparse
+import random
+from pathlib import Path
+
+import fitz
+
+WORDS = (
+    "analysis budget coastline culinary dataset delivery evaluation festival guidance harbour "
+    "itinerary journey landscape market methodology network objective overview planning quality "
+    "recipe regional research schedule strategy summary training travel village workflow"
+).split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+
+
+def sentence(rng, n_words):
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return " ".join(words).capitalize()
+
+
+def generate_pdf(path, pages=10, heading_sizes=(18, 15, 13), body_size=10, lines_per_page=40,
+                 headings_per_page=2, header="Synthetic Benchmark Report", footer=True, seed=0):
+    """
+    Write one synthetic PDF to path. heading_sizes are the H1/H2/H3 font sizes (largest first);
+    lines_per_page controls text density. header=None and footer=False drop the running
+    header and the "Page N" footer.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    line_height = body_size * 1.4
+    top, bottom = PAGE_HEIGHT * 0.15 + 20, PAGE_HEIGHT * 0.85 - 10
+    for pno in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        if header:
+            page.insert_text((50, 40), header, fontsize=9, fontname="helv")
+        if footer:
+            page.insert_text((PAGE_WIDTH / 2 - 20, PAGE_HEIGHT - 30), f"Page {pno + 1}", fontsize=9, fontname="helv")
+
+        y = top
+        if pno == 0:
+            page.insert_text((50, y), sentence(rng, 5).title(), fontsize=heading_sizes[0] + 6, fontname="hebo")
+            y += (heading_sizes[0] + 6) * 2
+        paragraph_line = 0
+        heading_at = set(rng.sample(range(lines_per_page), min(headings_per_page, lines_per_page)))
+        for i in range(lines_per_page):
+            if y > bottom:
+                break
+            if i in heading_at:
+                size = heading_sizes[rng.randrange(len(heading_sizes))]
+                y += size * 0.6
+                page.insert_text((50, y), sentence(rng, rng.randint(2, 6)).title(), fontsize=size, fontname="hebo")
+                y += size * 1.5
+                paragraph_line = 0
+            else:
+                # Paragraphs of a few lines; only the first line starts with a capital
+                text = sentence(rng, rng.randint(10, 14))
+                if paragraph_line % 5:
+                    text = text.lower()
+                paragraph_line += 1
+                page.insert_text((50, y), text, fontsize=body_size, fontname="helv")
+                y += line_height
+    doc.save(path)
+    doc.close()
+    return Path(path)
+
+
+def generate_corpus(out_dir, docs=3, pages=10, seed=0, **kwargs):
+    # Write docs PDFs named synthetic_NN.pdf into out_dir; returns their paths
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return [generate_pdf(out_dir / f"synthetic_{i:02d}.pdf", pages=pages, seed=seed + i, **kwargs)
+            for i in range(docs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic PDFs")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--docs", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--headings-per-page", type=int, default=2)
+    parser.add_argument("--heading-sizes", type=float, nargs="+", default=[18, 15, 13])
+    parser.add_argument("--no-header", action="store_true")
+    parser.add_argument("--no-footer", action="store_true")
+    args = parser.parse_args()
+    paths = generate_corpus(args.out_dir, docs=args.docs, pages=args.pages, lines_per_page=args.lines_per_page,
+                            headings_per_page=args.headings_per_page, heading_sizes=tuple(args.heading_sizes),
+                            header=None if args.no_header else "Synthetic Benchmark Report",
+                            footer=not args.no_footer)
+    print(f"✅ Wrote {len(paths)} PDF(s) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Thin client for service/daemon.py. Writes the same output files as the batch entry points.
+
+    python service/client.py health
+    python service/client.py outline [PDF ...] [--output-dir DIR]
+    python service/client.py collection [COLLECTION_DIR ...]
+    python service/client.py shutdown
+
+Without paths, `outline` processes Solution_1a/sample_dataset/pdfs into sample_dataset/outputs
+and `collection` processes Solution_1b/Collection_1..3, like process_pdfs.py and app.py.
+"""
+import argparse
+import json
+import sys
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PDF_DIR = ROOT / "Solution_1a" / "sample_dataset" / "pdfs"
+DEFAULT_OUTPUT_DIR = ROOT / "Solution_1a" / "sample_dataset" / "outputs"
+DEFAULT_COLLECTIONS = [ROOT / "Solution_1b" / f"Collection_{i}" for i in (1, 2, 3)]
+
+
+def call(url, path, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url + path, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"{path} failed with HTTP {e.code}: {e.read().decode('utf-8', 'replace')}")
+
+
+def run_outline(url, pdf_files, output_dir, jobs):
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    def one(pdf_file):
+        result = call(url, "/outline", {"pdf_path": str(pdf_file.resolve())})
+        with open(output_dir / f"{pdf_file.stem}.json", "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+        return pdf_file, result
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for pdf_file, result in pool.map(one, pdf_files):
+            print(f"📄 {pdf_file.name}: {result['title']!r}, {len(result['outline'])} heading(s)")
+
+
+def run_collections(url, collections, jobs):
+    def one(collection):
+        output = call(url, "/collection", {"collection_path": str(collection.resolve())})
+        with open(collection / "solution1b_output.json", "w") as f:
+            json.dump(output, f, indent=4)
+        return collection
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for collection in pool.map(one, collections):
+            print(f"✅ Output written to {collection / 'solution1b_output.json'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client for the warm-start extraction service")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--jobs", type=int, default=4, help="requests in flight at once (default: 4)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("health")
+    sub.add_parser("shutdown")
+    outline = sub.add_parser("outline")
+    outline.add_argument("pdfs", nargs="*", type=Path)
+    outline.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    collection = sub.add_parser("collection")
+    collection.add_argument("collections", nargs="*", type=Path)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "health":
+            print(json.dumps(call(args.url, "/health"), indent=4))
+        elif args.command == "shutdown":
+            print(json.dumps(call(args.url, "/shutdown", {}), indent=4))
+        elif args.command == "outline":
+            run_outline(args.url, args.pdfs or sorted(DEFAULT_PDF_DIR.glob("*.pdf")), args.output_dir, args.jobs)
+        else:
+            run_collections(args.url, args.collections or DEFAULT_COLLECTIONS, args.jobs)
+    except (RuntimeError, urllib.error.URLError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
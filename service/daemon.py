@@ -0,0 +1,210 @@
+"""
+Warm-start extraction service.
+
+Keeps the Solution_1a outline model (PDFOutlineExtractor) and the Solution_1b sentence model
+resident, and serves jobs over local HTTP so short runs don't pay the import and model-load cost:
+
+    GET  /health       status, uptime and queue counters
+    POST /outline      {"pdf_path": ...}         -> {"title": ..., "outline": [...]}
+    POST /collection   {"collection_path": ...}  -> solution1b output for the collection
+    POST /shutdown     stop accepting jobs, finish the running ones, close the persona keyword store
+
+Usage:
+    python service/daemon.py --port 8765 --concurrency 2 --max-queue 32
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "Solution_1a"))
+sys.path.insert(0, str(ROOT / "Solution_1b" / "src"))
+
+
+class JobQueue:
+    # Runs at most `concurrency` jobs at once and lets at most `max_queue` more wait; the rest are rejected
+    def __init__(self, concurrency, max_queue):
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job")
+        self.slots = threading.BoundedSemaphore(concurrency + max_queue)
+        self.lock = threading.Lock()
+        self.accepting = True
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args):
+        # Returns a Future, or None when the service is draining or the queue is full
+        if not self.accepting or not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return None
+        with self.lock:
+            self.queued += 1
+
+        def run():
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                self.slots.release()
+
+        return self.executor.submit(run)
+
+    def drain(self):
+        self.accepting = False
+        self.executor.shutdown(wait=True)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+
+class ExtractionService:
+    # Both pipelines' models, loaded once
+    def __init__(self, backend="torch", batch_size=32):
+        from pdf_outliner.extractor import PDFOutlineExtractor
+        import app as persona_app
+        import utils
+
+        utils.set_backend(backend)
+        utils.get_model()  # loaded on first use otherwise; the daemon exists to keep it warm
+        self.backend = backend
+        self.extractor = PDFOutlineExtractor(batch_size=batch_size, backend=backend)
+        # Concurrent /outline jobs must not call the tokenizer at once (fast tokenizers raise
+        # "Already borrowed"): their heading batches go through one scheduler thread instead
+        self.extractor.share_inference()
+        self.persona_app = persona_app
+        self.personas = persona_app.load_personas()
+
+    def outline(self, payload):
+        # extract_outline, not process_pdf: a failure must reach the client as a 500, not an empty outline
+        return self.extractor.extract_outline(payload["pdf_path"])
+
+    def collection(self, payload):
+        output, persona, ranked_sections = self.persona_app.rank_collection(payload["collection_path"], self.personas)
+        # The keyword store is thread-safe and commits each learn() on its own
+        self.persona_app.learn_new_keywords(self.personas, persona, ranked_sections)
+        return output
+
+    def save(self):
+        self.extractor.stop_sharing()
+        self.persona_app.save_personas(self.personas)
+
+
+def make_handler(service, jobs, started, request_shutdown):
+    routes = {"/outline": (service.outline, "pdf_path"), "/collection": (service.collection, "collection_path")}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._reply(404, {"error": f"unknown path {self.path}"})
+            self._reply(200, {
+                "status": "ok" if jobs.accepting else "draining",
+                "backend": service.backend,
+                "uptime_s": round(time.monotonic() - started, 1),
+                "jobs": jobs.stats(),
+            })
+
+        def do_POST(self):
+            if self.path == "/shutdown":
+                self._reply(202, {"status": "draining"})
+                return request_shutdown()
+            if self.path not in routes:
+                return self._reply(404, {"error": f"unknown path {self.path}"})
+
+            fn, field = routes[self.path]
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except json.JSONDecodeError as e:
+                return self._reply(400, {"error": f"invalid JSON: {e}"})
+            if not isinstance(payload, dict) or field not in payload:
+                return self._reply(400, {"error": f"missing field {field!r}"})
+
+            future = jobs.submit(fn, payload)
+            if future is None:
+                return self._reply(503, {"error": "queue full or shutting down", "jobs": jobs.stats()})
+            try:
+                self._reply(200, future.result())
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            print(f"🌐 {self.address_string()} {format % args}")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start outline and persona-ranking service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=2, help="jobs running at once (default: 2)")
+    parser.add_argument("--max-queue", type=int, default=32, help="jobs waiting before 503s (default: 32)")
+    parser.add_argument("--backend", choices=("torch", "onnx"), default="torch")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    print("⏳ Loading models...")
+    service = ExtractionService(backend=args.backend, batch_size=args.batch_size)
+    jobs = JobQueue(args.concurrency, args.max_queue)
+
+    server = None
+
+    def request_shutdown(*_):
+        # serve_forever must be stopped from another thread than the one running it
+        jobs.accepting = False
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, jobs, started, request_shutdown))
+    # Keep handler threads joinable so in-flight responses are sent before exit
+    server.daemon_threads = False
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    print(f"🚀 Listening on http://{args.host}:{args.port} ({time.monotonic() - started:.1f}s to warm up)")
+    server.serve_forever()
+
+    print("🛑 Shutting down: finishing running jobs...")
+    jobs.drain()
+    server.server_close()
+    service.save()
+    print(f"✅ Stopped. {jobs.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())